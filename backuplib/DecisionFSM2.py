@@ -1,11 +1,14 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 from typing import Callable, Dict, Tuple, Optional
+from pathlib import Path
+import json
 
 # ----- Domain state -----------------------------------------------------------
 class S(Enum):
     START          = auto()
+    CHECK_PRESENCE = auto()
     NO_STATE_FILE_OR_NO_OUTPUT = auto()
     
     STATE_FILE_OUTPUT_MATCHES_GENERATED_CURRENT_SIGNATURE = auto()
@@ -36,9 +39,23 @@ class Ctx:
     manifest_exists: Optional[bool] = None
     state_exists: Optional[bool] = None
     state_parse_ok: Optional[bool] = None
+    state_obj: Optional[dict] = None     # parsed state file, shared by the checks
     input_sig_matches: Optional[bool] = None
     output_hash_matches: Optional[bool] = None
     error: Optional[str] = None
+    # memoised results of the heavy callables above
+    _quick_sig_value: Optional[str] = field(default=None, repr=False)
+    _manifest_hash_value: Optional[str] = field(default=None, repr=False)
+
+    def current_quick_sig(self) -> str:
+        if self._quick_sig_value is None:
+            self._quick_sig_value = self.quick_sig()
+        return self._quick_sig_value
+
+    def current_manifest_hash(self) -> str:
+        if self._manifest_hash_value is None:
+            self._manifest_hash_value = self.manifest_hash()
+        return self._manifest_hash_value
 
 # ----- Actions: compute facts / do work, return next state --------------------
 Action = Callable[[Ctx], S]
@@ -47,17 +64,15 @@ def start(ctx: Ctx) -> S:
     return S.CHECK_PRESENCE
 
 def check_presence(ctx: Ctx) -> S:
-    from pathlib import Path
     mp, sp = Path(ctx.manifest_path), Path(ctx.state_path)
     ctx.manifest_exists = mp.exists()
     ctx.state_exists = sp.exists()
     return S.CHECK_STATE if ctx.state_exists else (S.REBUILD if not ctx.manifest_exists else S.REBUILD)
 
 def check_state(ctx: Ctx) -> S:
-    import json, pathlib
     try:
-        text = pathlib.Path(ctx.state_path).read_text(encoding="utf-8")
-        _ = json.loads(text)  # keep raw; parse again in checks
+        text = Path(ctx.state_path).read_text(encoding="utf-8")
+        ctx.state_obj = json.loads(text)
         ctx.state_parse_ok = True
         return S.CHECK_INPUT
     except Exception as e:
@@ -66,18 +81,16 @@ def check_state(ctx: Ctx) -> S:
         return S.ERROR
 
 def check_input(ctx: Ctx) -> S:
-    import json, pathlib
-    st = json.loads(pathlib.Path(ctx.state_path).read_text(encoding="utf-8"))
+    st = ctx.state_obj
     prev = st.get("initial_signature_hash") or st.get("init_sig_hex")
-    cur = ctx.quick_sig()  # heavy; evaluated once here
+    cur = ctx.current_quick_sig()  # heavy; evaluated once per Ctx
     ctx.input_sig_matches = (prev == cur)
     return S.CHECK_OUTPUT if ctx.input_sig_matches else S.REBUILD
 
 def check_output(ctx: Ctx) -> S:
-    import json, pathlib
-    st = json.loads(pathlib.Path(ctx.state_path).read_text(encoding="utf-8"))
+    st = ctx.state_obj
     prev = st.get("output_signature_hash") or st.get("output_sig_hex")
-    cur = ctx.manifest_hash()
+    cur = ctx.current_manifest_hash()
     ctx.output_hash_matches = (prev == cur)
     return S.SKIP if ctx.output_hash_matches else S.REBUILD
 
@@ -112,12 +125,18 @@ TRANSITIONS: Dict[S, Action] = {
     S.DONE:           lambda ctx: S.DONE,
 }
 
+# S values are contiguous auto() ints, so dispatch can index a tuple
+# instead of hashing the enum member on every step
+_TRANSITIONS_TUPLE: Tuple[Optional[Action], ...] = tuple(TRANSITIONS.get(s) for s in S)
+
 # ----- Engine loop with trace -------------------------------------------------
 def run_fsm(ctx: Ctx, *, begin: S = S.START) -> Tuple[S, list[Tuple[S, str]]]:
     trace: list[Tuple[S, str]] = []
     state = begin
     while True:
-        action = TRANSITIONS[state]
+        action = _TRANSITIONS_TUPLE[state.value - 1]
+        if action is None:
+            raise KeyError(state)
         trace.append((state, action.__name__))
         next_state = action(ctx)
         if next_state is S.DONE:
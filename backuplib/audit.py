@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 import sqlite3, time, json, contextlib
 from typing import Any, Optional
-from backuplib.checksumtools import canonicalize_json, sha256_hex
+from backuplib.checksumtools import canonicalize_json, fast_digest_hex
 from backuplib.logging import setup_logging, WithContext
 from localtypes.projecttypes import AuditStageRecord
 from enum import Enum
@@ -12,6 +12,24 @@ from enum import Enum
 
 DEFAULT_DB = Path.home() / ".odin_backup" / "audit.db"
 
+# statements are built once so every call hands sqlite the same string
+# and hits the connection's statement cache
+_SQL_START_RUN = (
+    "INSERT INTO runs(run_id, name, started_at, status, meta_json, input_sig_json, input_sig_hash) VALUES(?,?,?,?,?,?,?) "
+    "ON CONFLICT(run_id) DO UPDATE SET name=excluded.name, started_at=excluded.started_at, finished_at=NULL, "
+    "status=excluded.status, meta_json=excluded.meta_json, "
+    "input_sig_json=excluded.input_sig_json, input_sig_hash=excluded.input_sig_hash, "
+    # everything else goes back to NULL, as INSERT OR REPLACE left it
+    "output_sig_json=NULL, output_sig_hash=NULL, output_path=NULL, "
+    "current_upstream_signature=NULL, previous_upstream_signature=NULL, "
+    "previous_job_signature=NULL, job_result_signature=NULL, parent_run=NULL"
+)
+_SQL_SET_PARENT_RUN = "UPDATE runs SET parent_run=? WHERE run_id=?"
+_SQL_FINISH_RUN = "UPDATE runs SET finished_at=?, status=?, output_path=?, output_sig_hash=? WHERE run_id=?"
+_SQL_START_STEP = "INSERT INTO steps(run_id,name,started_at, status) VALUES(?,?,?,?)"
+_SQL_FINISH_STEP = "UPDATE steps SET finished_at=?, status=?, message=? WHERE id=?"
+_SQL_RECORD_STEP = "INSERT INTO steps(run_id,name,started_at,finished_at,status,message) VALUES(?,?,?,?,?,?)"
+
 class AuditDatabaseException(Exception):
     '''There was a problem with the Odin Backup Audit Database'''
 
@@ -19,8 +37,13 @@ def _now() -> int: return int(time.time())
 
 def _connect(db_path: Path) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("PRAGMA foreign_keys=ON")
+    conn = sqlite3.connect(str(db_path), cached_statements=256)
+    conn.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA foreign_keys=ON;"
+    )
     return conn
 
 @dataclass
@@ -44,7 +67,32 @@ class Tracker:
 
     def __init__(self, db_path: Path = DEFAULT_DB):
         self.db = db_path
-        self.logger = setup_logging(level="INFO", appName="odin_backup_auditing")
+        # logging is configured on first use; most runs never log from here
+        self._logger: WithContext | None = None
+        self._log_extra: dict[str, Any] = {}
+        # one connection for the life of the tracker; each write is its own
+        # `with self._conn:` transaction
+        self._conn = _connect(self.db)
+        # fixed statement text per column so sqlite's statement cache hits
+        self._sig_sql = {
+            sig: f"UPDATE runs SET {sig.value}=? WHERE run_id=?" for sig in RunSignature
+        }
+
+    @property
+    def logger(self) -> WithContext:
+        if self._logger is None:
+            base = setup_logging(level="INFO", appName="odin_backup_auditing")
+            self._logger = WithContext(base, self._log_extra)
+        return self._logger
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "Tracker":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     class JobTrackingStatus(Enum):
         SUCCESS = "success"
@@ -58,51 +106,49 @@ class Tracker:
                     self,
                     run_id: str,
                     run_name: str,
-                    input_sig_json: str | None = None,
+                    input_sig: dict[str, Any] | str | None = None,
                     meta: Optional[dict[str, Any]] = None
                   
                   ) -> None:
         
         canonical_input_sig_json = ""
         input_sig_hash=""
-        self.logger = WithContext(self.logger, {"run_id": run_id}) # type: ignore
-        if input_sig_json is not None:
-            canonical_input_sig_json = canonicalize_json(input_sig_json)
+        self._log_extra["run_id"] = run_id
+        if isinstance(input_sig, dict):
+            # already parsed: serialize canonically once instead of dump + reparse
+            canonical_input_sig_json = json.dumps(input_sig, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        elif input_sig is not None:
+            canonical_input_sig_json = canonicalize_json(input_sig)
             assert canonical_input_sig_json is not None
-            input_sig_hash = sha256_hex(canonical_input_sig_json)
-        with _connect(self.db) as c:
+        if input_sig is not None:
+            input_sig_hash = fast_digest_hex(canonical_input_sig_json)
+        with self._conn as c:
             try:
                 c.execute(
-                    "INSERT OR REPLACE INTO runs(run_id, name, started_at, status, meta_json, input_sig_json, input_sig_hash) VALUES(?,?,?,?,?,?,?)",
+                    _SQL_START_RUN,
                     (run_id, run_name, _now(), "running", json.dumps(meta or {}), canonical_input_sig_json, input_sig_hash),
                 )
-                c.commit()
             except:
                 self.logger.exception("could not add audit to start run")
                 raise AuditDatabaseException()
 
     def set_signature_data(self, run_id: str, signature_data: RunSignature, column: RunSignature):
         column_str = str(column)
-        with _connect(self.db) as c:
+        with self._conn as c:
             try:
-                c.execute(
-                    f"UPDATE runs SET {column_str}=? WHERE run_id=?",
-                    (signature_data, run_id),
-                )
-                c.commit()
+                c.execute(self._sig_sql[column], (signature_data, run_id))
             except:
                 msg = f"could not add {column_str} to audit db"
                 self.logger.exception(msg)
                 raise AuditDatabaseException(msg)
 
     def set_parent_id(self, run_id: str, parent_id: str):
-        with _connect(self.db) as c:
+        with self._conn as c:
             try:
                 c.execute(
-                    f"UPDATE runs SET parent_run=? WHERE run_id=?",
+                    _SQL_SET_PARENT_RUN,
                     (parent_id, run_id),
                 )
-                c.commit()
             except:
                 msg = f"could not add parent_run to audit db"
                 self.logger.exception(msg)
@@ -115,13 +161,12 @@ class Tracker:
                    output_path : str ="", 
                    output_sig_hash : str = "") -> None:
         status_str = str(status)
-        with _connect(self.db) as c:
+        with self._conn as c:
             try:
                 c.execute(
-                    "UPDATE runs SET finished_at=?, status=?, output_path=?, output_sig_hash=? WHERE run_id=?",
+                    _SQL_FINISH_RUN,
                     (_now(), status_str, output_path, output_sig_hash, run_id),
                 )
-                c.commit()
             except:
                 self.logger.exception("could not add audit to finish run")
                 raise AuditDatabaseException()
@@ -132,15 +177,14 @@ class Tracker:
         run_id: str,
         name: str,
     ) -> StepRef:
-        with _connect(self.db) as c:
+        with self._conn as c:
             try:    
                 cur = c.execute(
-                    "INSERT INTO steps(run_id,name,started_at, status) VALUES(?,?,?,?)",
+                    _SQL_START_STEP,
                     (run_id, name, _now(), "running"),
                 )
                 step_id = cur.lastrowid
                 assert step_id is not None
-                c.commit()
             except:
                 self.logger.exception("could not initiate step in audit database")
                 raise AuditDatabaseException()
@@ -152,14 +196,13 @@ class Tracker:
         status: str | JobTrackingStatus,
         message: str | None
     ) -> None:
-        status_str = str(status)
-        with _connect(self.db) as c:
+        # written right away: a step left 'running' would make a crashed job look hung
+        with self._conn as c:
             try:
                 c.execute(
-                    "UPDATE steps SET finished_at=?, status=?, message=? WHERE id=?",
-                    (_now(), status_str, message, step.id),
+                    _SQL_FINISH_STEP,
+                    (_now(), str(status), message, step.id),
                 )
-                c.commit()
             except Exception as e:
                 self.logger.exception("an exception occurred while finishing a step")
                 raise AuditDatabaseException() from e
@@ -171,16 +214,28 @@ class Tracker:
         run_id: str,
         name: str,
     ):
-        step = self.start_step(run_id, name)
+        """
+        The step is written once, as a single finished row, when the block
+        exits.
+        """
+        started_at = _now()
+        yielded : AuditStageRecord = { "status" : "", "message" : None}
         try:
-            yielded : AuditStageRecord = { "status" : "", "message" : None}
-            yield yielded 
-            status = yielded.get("status", "failed")
-            message = yielded.get("message", "")
-            self.finish_step(step, status, message=message)
+            yield yielded
         except Exception as e:
-            self.finish_step(step, "failed", message=str(e))
+            self._record(run_id, name, started_at, "failed", str(e))
             raise e
+        status = yielded.get("status", "failed")
+        message = yielded.get("message", "")
+        self._record(run_id, name, started_at, str(status), message)
+
+    def _record(self, run_id: str, name: str, started_at: int, status: str, message: str | None) -> None:
+        with self._conn as c:
+            try:
+                c.execute(_SQL_RECORD_STEP, (run_id, name, started_at, _now(), status, message))
+            except Exception as e:
+                self.logger.exception("could not record step in audit database")
+                raise AuditDatabaseException() from e
         
         
     # def audit_this(self, run_id, name):
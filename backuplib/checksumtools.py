@@ -1,17 +1,73 @@
 #!/usr/bin/env python3
 
-import hashlib, tempfile
+import hashlib, functools, re, threading
 from pathlib import Path
-import os, json
-from typing import Tuple, Any
+import os, json, tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Tuple, Any, Iterable
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the reference
+    orjson = None
 
 class InvalidJSONException(Exception):
     '''Exception: attempted to canonicalize invalid json'''
 
 # Helpers
+
+# A flat object of plain strings/ints/literals is the only shape we can prove
+# canonical without parsing: no nesting, no escapes, no floats, no "-0".
+_JSON_STRING = r'"([^"\\\x00-\x1f]*)"'
+_JSON_SCALAR = r'(?:"[^"\\\x00-\x1f]*"|0|-?[1-9][0-9]*|true|false|null)'
+_CANONICAL_FLAT_OBJECT = re.compile(
+    r"\{(?:" + _JSON_STRING + ":" + _JSON_SCALAR
+    + r"(?:," + _JSON_STRING + ":" + _JSON_SCALAR + r")*)?\}"
+)
+_CANONICAL_PAIR = re.compile(r"[{,]" + _JSON_STRING + ":" + _JSON_SCALAR)
+
+# orjson spells exponent-range floats differently from json (1e16 vs 1e+16,
+# 0.00001 vs 1e-05); any output that might hold one is redone with json so
+# canonical text stays byte-identical whichever backend produced it
+_ORJSON_FLOAT_MISMATCH = re.compile(rb"\de|0\.0000")
+
+def _orjson_dumps(obj: Any) -> bytes | None:
+    if orjson is None:
+        return None
+    try:
+        out = orjson.dumps(
+            obj,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    except orjson.JSONEncodeError:
+        return None
+    if _ORJSON_FLOAT_MISMATCH.search(out):
+        return None
+    return out
+
+def _is_canonical(s: str) -> bool:
+    if _CANONICAL_FLAT_OBJECT.fullmatch(s) is None:
+        return False
+    keys = _CANONICAL_PAIR.findall(s)
+    return all(a < b for a, b in zip(keys, keys[1:]))
+
 def canonicalize_json(text: str | None) -> str | None:
     if text is None:
         return None
+    if _is_canonical(text):
+        return text
+    return _canonicalize_json_impl(text)
+
+# the same signature strings come through on every run; cache by raw text
+@functools.lru_cache(maxsize=1024)
+def _canonicalize_json_impl(text: str) -> str:
+    if orjson is not None:
+        try:
+            out = _orjson_dumps(orjson.loads(text))
+        except orjson.JSONDecodeError:
+            out = None  # let json decide whether it is really invalid
+        if out is not None:
+            return out.decode("utf-8")
     try:
         obj = json.loads(text)
     except Exception:
@@ -20,33 +76,122 @@ def canonicalize_json(text: str | None) -> str | None:
     # Canonical dump for stable hashing (order/whitespace independent)
     return json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
 
+@functools.lru_cache(maxsize=1024)
 def sha256_hex(s : str):
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
+def fast_digest_hex(s: str) -> str:
+    """BLAKE2b-256 hex of `s`, for internal-only hashes never checked by sha256sum."""
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=32).hexdigest()
+
+def sha256_backend() -> str:
+    """Describe which implementation `hashlib.sha256` is bound to, for logs."""
+    if type(hashlib.sha256()).__module__ == "_hashlib":
+        import ssl
+        return f"openssl ({ssl.OPENSSL_VERSION})"
+    return "builtin"
+
+# below this a single plain read() is cheaper than the chunked loop
+_SMALL_FILE_THRESHOLD = 64 * 1024
+
+_CHUNK_SIZE = 4 * 1024 * 1024
 
-def compute_sha256(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+def _advise_sequential(fd: int) -> None:
+    # widen kernel readahead for the streaming read; not available on macOS/Windows
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+def compute_sha256(path: str | Path, chunk_size: int = _CHUNK_SIZE) -> str:
     """Return hex SHA-256 of file at `path`, streaming in chunks."""
-    h = hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
-    return h.hexdigest()
+        size = os.fstat(f.fileno()).st_size
+        if size < _SMALL_FILE_THRESHOLD:
+            return hashlib.sha256(f.read()).hexdigest()
+        # no mmap: a file truncated by another process while mapped raises
+        # SIGBUS and kills the run, where a streaming read just comes up short
+        _advise_sequential(f.fileno())
+        return _sha256_readinto(f, chunk_size)
+
+# one read buffer per hashing thread, reused from file to file
+_read_buffers = threading.local()
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+def _read_buffer(chunk_size: int) -> tuple[bytearray, memoryview]:
+    cached = getattr(_read_buffers, "buf", None)
+    if cached is None or len(cached[0]) != chunk_size:
+        buf = bytearray(chunk_size)
+        cached = _read_buffers.buf = (buf, memoryview(buf))
+    return cached
+
+def _sha256_readinto(f, chunk_size: int = _CHUNK_SIZE) -> str:
+    """Hex SHA-256 of binary file `f`, read into this thread's reused buffer."""
     h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk: break
-            h.update(chunk)
+    buf, view = _read_buffer(chunk_size)
+    while n := f.readinto(buf):
+        h.update(view[:n])
     return h.hexdigest()
 
+def sha256_file(path: Path, chunk_size: int = _CHUNK_SIZE) -> str:
+    with path.open("rb") as f:
+        _advise_sequential(f.fileno())
+        return _sha256_readinto(f, chunk_size)
+
+def hashing_pool(workers: int | None = None) -> Executor:
+    """
+    Executor for fanning file hashing out across cores. Threads are enough:
+    readinto() and sha256.update() on a large buffer both release the GIL.
+    """
+    workers = workers or os.cpu_count()
+    return ThreadPoolExecutor(max_workers=workers)
+
+def compute_sha256_many(paths: Iterable[Path], workers: int | None = None) -> dict[Path, str]:
+    """Return {path: hex SHA-256} for every path, hashing in parallel."""
+    paths = list(paths)
+    with hashing_pool(workers) as ex:
+        return dict(zip(paths, ex.map(compute_sha256, paths, chunksize=8)))
+
 def hash_script(script_path: Path) -> str:
     return sha256_file(script_path)
 
+_DIGEST_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+# list items are encoded this many at a time (one C-encoder call per slice)
+_DIGEST_SLICE = 1024
+
+def _iter_json_chunks(obj: Any, depth: int = 2) -> Iterable[str]:
+    """
+    The text of json.dumps(obj, sort_keys=True, separators=(",", ":")) in
+    pieces: the top `depth` container levels are walked here and lists are
+    emitted in slices, so a large manifest is never one giant string.
+    """
+    if depth and type(obj) in (list, tuple):
+        yield "["
+        for i in range(0, len(obj), _DIGEST_SLICE):
+            if i:
+                yield ","
+            yield _DIGEST_ENCODER.encode(list(obj[i:i + _DIGEST_SLICE]))[1:-1]
+        yield "]"
+    elif depth and type(obj) is dict and all(type(k) is str for k in obj):
+        yield "{"
+        for i, key in enumerate(sorted(obj)):
+            if i:
+                yield ","
+            yield _DIGEST_ENCODER.encode(key)
+            yield ":"
+            yield from _iter_json_chunks(obj[key], depth - 1)
+        yield "}"
+    else:
+        yield _DIGEST_ENCODER.encode(obj)
+
 def digest(obj : Any) -> str:
-    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(data).hexdigest()
+    out = _orjson_dumps(obj)
+    # json.dumps escapes non-ASCII (and DEL) here, orjson never does; and
+    # orjson writes NaN/Infinity as null, so any null has to be re-checked
+    if out is not None and out.isascii() and b"\x7f" not in out and b"null" not in out:
+        return hashlib.sha256(out).hexdigest()
+    h = hashlib.sha256()
+    for chunk in _iter_json_chunks(obj):
+        h.update(chunk.encode("ascii"))  # ensure_ascii output
+    return h.hexdigest()
 
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
@@ -54,20 +199,38 @@ def sha256_bytes(data: bytes) -> str:
 def sha256_string(s: str) -> str:
     return sha256_bytes(s.encode("utf-8"))
 
-def write_sha256_sidecar(target: str | Path) -> Tuple[Path, str]:
+# sidecar directories already created by this process
+_verified_dirs: set[Path] = set()
+
+def write_sha256_sidecar(target: str | Path, digest: str | None = None) -> Tuple[Path, str]:
     """
     Write a sidecar checksum file: `<target>.sha256`, contents:
     <HEX>  <BASENAME>\n
     Uses atomic replace to avoid half-written files.
+    Pass `digest` when the hash was already taken while writing `target`
+    to skip re-reading it.
     """
     target = Path(target)
-    digest = compute_sha256(target)
+    if digest is None:
+        digest = compute_sha256(target)
     sidecar = target.with_suffix(target.suffix + ".sha256")  # keeps .tar.gz → .tar.gz.sha256
 
     # atomic write
-    sidecar.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=sidecar.parent, encoding="utf-8") as tmp:
-        tmp.write(f"{digest}  {target.name}\n")
-        tmp_path = Path(tmp.name)
-    os.replace(tmp_path, sidecar)  # atomic on same filesystem
+    if sidecar.parent not in _verified_dirs:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        _verified_dirs.add(sidecar.parent)
+    # a unique temp name per writer, as filesutil.atomic_write_bytes does
+    fd, tmp_name = tempfile.mkstemp(dir=sidecar.parent, prefix=sidecar.name + ".", suffix=".tmp")
+    try:
+        try:
+            os.fchmod(fd, 0o644)  # mkstemp creates 0o600
+            os.write(fd, f"{digest}  {target.name}\n".encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_name, sidecar)  # atomic on same filesystem
+    except BaseException:
+        try: os.unlink(tmp_name)   # cleanup only on failure
+        except OSError: pass
+        raise
     return sidecar, digest
@@ -1,11 +1,17 @@
 from dataclasses import dataclass
 from pathlib import Path
+from functools import cached_property, lru_cache
 from backuplib.exceptions import ConfigException
 import yaml
 
+try:
+    from yaml import CSafeLoader as YamlLoader  # libyaml C parser
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 CONFIG_PATH = Path("~/.config/odin-backup-system/config.yaml").expanduser()
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class QuickManifestConfig:
     manifest_exclusions : list[str]
     dir : Path
@@ -13,113 +19,211 @@ class QuickManifestConfig:
     upstream_statepath : Path
     outfile : Path
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ResticSnapshotJob:
     restic_repo_path: Path
     restic_excludes_file_path: Path
     restic_password_file_path: Path
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EncryptionJob:
     upstream_statepath : Path
     dir : Path
     statefile_name : str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ManifestJob:
     upstream_statepath: Path
     dir: Path
     statefile_name: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RsyncMirroringJob:
     upstream_statepath : Path
 
-@dataclass
+_REQUIRED_KEYS = (
+    "REPO_DIR", "MANIFEST_EXCLUSIONS", "LOCAL_ZONE", "DEFAULT_TARBALL_NAME",
+    "MANIFEST_STATE_NAME", "TARBALL_EXCLUSIONS", "MANIFEST_DIR", "MANIFEST_FILENAME",
+    "TARBALL_OUPUT", "LATEST_TARBALL_FILENAME", "RECIPIENT", "ODIN_ENCRYPTED_DIR",
+    "OFFSITE_SYNC_DIR", "TARBALL_OUTPUT_IDEMPOTENT", "TARBALL_STATE_FILENAME",
+    "GIT_PULL_STATEFILE_NAME", "TARBALL_JOB_UPSTREAM_STATEPATH", "ENCRYPTED_TARBALL_NAME",
+    "QUICK_MANIFEST_SCAN", "ENCRYPTION_JOB", "RSYNC_MIRRORING", "SIDECAR_ROOT",
+    "RSYNC_EXCLUSIONS_FILE", "RSYNC_MIRRORING_FILE", "RSYNC_MIRRORING_JOB",
+    "MANIFEST_JOB", "RESTIC_SNAPSHOT_JOB",
+)
+
+
 class OdinConfig:
-    repo_dir : Path
-    manifest_exclusions : list[str]
-    local_zone: str
-    default_tarball_name : str
-    manifest_state_name: str
-    tarball_exclusions: list[str]
-    manifest_dir: Path
-    manifest_file_name: str
-    tarball_dir: Path
-    latest_tarball_filename : str
-    recipient: str
-    encrypted_dir: Path
-    offsite_sync_dir : Path
-    tarball_dir_idempotent: Path
-    tarball_state_filename : str
-    git_pull_statefile_name : str
-    tarball_job_upstream_statepath : Path
-    encrypted_tarball_name: str
-    quick_manifest_config : QuickManifestConfig
-    encryption_job : EncryptionJob
-    rsync_mirroring : list[str]
-    sidecar_root : str
-    rsync_exclusions_file : Path
-    rsync_mirroring_file : str
-    rsync_mirroring_job : RsyncMirroringJob
-    manifest_job : ManifestJob
-    restic_snapshot_job : ResticSnapshotJob
+    """
+    Read-only view over the raw config dict. Every field is built on first
+    access and then cached, so a job only pays for the sections it uses.
+    Missing top-level keys are reported up front; a missing key inside a
+    section surfaces when that section is first read.
+    """
+
+    def __init__(self, raw: dict):
+        if not isinstance(raw, dict) or any(k not in raw for k in _REQUIRED_KEYS):
+            raise ConfigException(f"Missing required config key. Config path: {CONFIG_PATH}.")
+        object.__setattr__(self, "_raw", raw)
+
+    # load_config() hands one instance to every caller, so nothing may be
+    # assigned on it; cached_property fills __dict__ directly and is unaffected
+    def __setattr__(self, name, value):
+        raise AttributeError(f"OdinConfig is read-only; cannot set {name!r}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"OdinConfig is read-only; cannot delete {name!r}")
+
+    def _get(self, *keys: str):
+        node = self._raw
+        try:
+            for k in keys:
+                node = node[k]
+        except (KeyError, TypeError):
+            raise ConfigException(f"Missing required config key. Config path: {CONFIG_PATH}.") from None
+        return node
+
+    @cached_property
+    def repo_dir(self) -> Path:
+        return Path(self._get("REPO_DIR")).expanduser().resolve()
+
+    @cached_property
+    def manifest_exclusions(self) -> list[str]:
+        return self._get("MANIFEST_EXCLUSIONS")
+
+    @cached_property
+    def local_zone(self) -> str:
+        return self._get("LOCAL_ZONE")
+
+    @cached_property
+    def default_tarball_name(self) -> str:
+        return self._get("DEFAULT_TARBALL_NAME")
+
+    @cached_property
+    def manifest_state_name(self) -> str:
+        return self._get("MANIFEST_STATE_NAME")
+
+    @cached_property
+    def tarball_exclusions(self) -> list[str]:
+        return self._get("TARBALL_EXCLUSIONS")
+
+    @cached_property
+    def manifest_dir(self) -> Path:
+        return Path(self._get("MANIFEST_DIR")).expanduser().resolve()
+
+    @cached_property
+    def manifest_file_name(self) -> str:
+        return self._get("MANIFEST_FILENAME")
+
+    @cached_property
+    def tarball_dir(self) -> Path:
+        return Path(self._get("TARBALL_OUPUT"))
+
+    @cached_property
+    def latest_tarball_filename(self) -> str:
+        return self._get("LATEST_TARBALL_FILENAME")
+
+    @cached_property
+    def recipient(self) -> str:
+        return self._get("RECIPIENT")
+
+    @cached_property
+    def encrypted_dir(self) -> Path:
+        return Path(self._get("ODIN_ENCRYPTED_DIR"))
+
+    @cached_property
+    def offsite_sync_dir(self) -> Path:
+        return Path(self._get("OFFSITE_SYNC_DIR"))
+
+    @cached_property
+    def tarball_dir_idempotent(self) -> Path:
+        return Path(self._get("TARBALL_OUTPUT_IDEMPOTENT"))
+
+    @cached_property
+    def tarball_state_filename(self) -> str:
+        return self._get("TARBALL_STATE_FILENAME")
+
+    @cached_property
+    def git_pull_statefile_name(self) -> str:
+        return self._get("GIT_PULL_STATEFILE_NAME")
+
+    @cached_property
+    def tarball_job_upstream_statepath(self) -> Path:
+        return Path(self._get("TARBALL_JOB_UPSTREAM_STATEPATH"))
+
+    @cached_property
+    def encrypted_tarball_name(self) -> str:
+        return self._get("ENCRYPTED_TARBALL_NAME")
+
+    @cached_property
+    def quick_manifest_config(self) -> QuickManifestConfig:
+        return QuickManifestConfig(
+            dir = Path(self._get("QUICK_MANIFEST_SCAN", "dir")),
+            statefile_name = self._get("QUICK_MANIFEST_SCAN", "statefile_name"),
+            upstream_statepath = Path(self._get("QUICK_MANIFEST_SCAN", "upstream_statepath")),
+            outfile = Path(self._get("QUICK_MANIFEST_SCAN", "outfile")),
+            manifest_exclusions = self._get("MANIFEST_EXCLUSIONS")
+        )
+
+    @cached_property
+    def encryption_job(self) -> EncryptionJob:
+        return EncryptionJob(
+            upstream_statepath = Path(self._get("ENCRYPTION_JOB", "upstream_statepath")),
+            dir = Path(self._get("ENCRYPTION_JOB", "dir")),
+            statefile_name = self._get("ENCRYPTION_JOB", "statefile_name")
+        )
+
+    @cached_property
+    def rsync_mirroring(self) -> list[str]:
+        return self._get("RSYNC_MIRRORING")
+
+    @cached_property
+    def sidecar_root(self) -> str:
+        return self._get("SIDECAR_ROOT")
+
+    @cached_property
+    def rsync_exclusions_file(self) -> Path:
+        return Path(self._get("RSYNC_EXCLUSIONS_FILE"))
+
+    @cached_property
+    def rsync_mirroring_file(self) -> str:
+        return self._get("RSYNC_MIRRORING_FILE")
+
+    @cached_property
+    def rsync_mirroring_job(self) -> RsyncMirroringJob:
+        return RsyncMirroringJob(
+            upstream_statepath=Path(self._get("RSYNC_MIRRORING_JOB", "UPSTREAM_STATEPATH"))
+        )
+
+    @cached_property
+    def manifest_job(self) -> ManifestJob:
+        return ManifestJob(upstream_statepath=Path(self._get("MANIFEST_JOB", "upstream_statepath")),
+                           dir=Path(self._get("MANIFEST_JOB", "dir")),
+                           statefile_name=self._get("MANIFEST_JOB", "statefile_name")
+                           )
+
+    @cached_property
+    def restic_snapshot_job(self) -> ResticSnapshotJob:
+        return ResticSnapshotJob(
+            restic_password_file_path = Path(self._get("RESTIC_SNAPSHOT_JOB", "restic_password_file_path")),
+            restic_excludes_file_path = Path(self._get("RESTIC_SNAPSHOT_JOB", "restic_excludes_file_path")),
+            restic_repo_path = Path(self._get("RESTIC_SNAPSHOT_JOB", "restic_repo_path"))
+        )
 
 
 def load_config() -> OdinConfig:
-    with open(CONFIG_PATH, "r") as f:
-        config = yaml.safe_load(f)
-    try:
-        repo_dir = Path(config["REPO_DIR"]).expanduser().resolve()
-        manifest_dir = Path(config["MANIFEST_DIR"]).expanduser().resolve()
-        odinConfig = OdinConfig(
-                    repo_dir=repo_dir,
-                    manifest_exclusions = config["MANIFEST_EXCLUSIONS"],
-                    local_zone = config["LOCAL_ZONE"],
-                    default_tarball_name = config["DEFAULT_TARBALL_NAME"],
-                    manifest_state_name = config["MANIFEST_STATE_NAME"],
-                    tarball_exclusions = config["TARBALL_EXCLUSIONS"],
-                    manifest_dir = manifest_dir,
-                    manifest_file_name=config["MANIFEST_FILENAME"],
-                    tarball_dir = Path(config["TARBALL_OUPUT"]),
-                    latest_tarball_filename = config["LATEST_TARBALL_FILENAME"],
-                    recipient = config["RECIPIENT"],
-                    encrypted_dir= Path(config["ODIN_ENCRYPTED_DIR"]),
-                    offsite_sync_dir = Path(config["OFFSITE_SYNC_DIR"]),
-                    tarball_dir_idempotent = Path(config["TARBALL_OUTPUT_IDEMPOTENT"]),
-                    tarball_state_filename=config["TARBALL_STATE_FILENAME"],
-                    git_pull_statefile_name=config["GIT_PULL_STATEFILE_NAME"],
-                    tarball_job_upstream_statepath=Path(config["TARBALL_JOB_UPSTREAM_STATEPATH"]),
-                    encrypted_tarball_name=config["ENCRYPTED_TARBALL_NAME"],
-                    quick_manifest_config = QuickManifestConfig(
-                        dir = Path(config["QUICK_MANIFEST_SCAN"]["dir"]),
-                        statefile_name = config["QUICK_MANIFEST_SCAN"]["statefile_name"],
-                        upstream_statepath = Path(config["QUICK_MANIFEST_SCAN"]["upstream_statepath"]),
-                        outfile = Path(config["QUICK_MANIFEST_SCAN"]["outfile"]),
-                        manifest_exclusions = config["MANIFEST_EXCLUSIONS"]
-                    ),
-                    encryption_job = EncryptionJob(
-                        upstream_statepath = Path(config["ENCRYPTION_JOB"]["upstream_statepath"]),
-                        dir = Path(config["ENCRYPTION_JOB"]["dir"]),
-                        statefile_name = config["ENCRYPTION_JOB"]["statefile_name"]
-                    ),
-                    rsync_mirroring=config["RSYNC_MIRRORING"],
-                    sidecar_root=config["SIDECAR_ROOT"],
-                    rsync_exclusions_file=Path(config["RSYNC_EXCLUSIONS_FILE"]),
-                    rsync_mirroring_file= config["RSYNC_MIRRORING_FILE"],
-                    rsync_mirroring_job = RsyncMirroringJob(
-                        upstream_statepath=Path(config["RSYNC_MIRRORING_JOB"]["UPSTREAM_STATEPATH"])
-                    ),
-                    manifest_job = ManifestJob(upstream_statepath=Path(config["MANIFEST_JOB"]["upstream_statepath"]),
-                                                dir=Path(config["MANIFEST_JOB"]["dir"]),
-                                                statefile_name=config["MANIFEST_JOB"]["statefile_name"]
-                                               ),
-                    restic_snapshot_job = ResticSnapshotJob(
-                                                        restic_password_file_path = Path(config["RESTIC_SNAPSHOT_JOB"]["restic_password_file_path"]),
-                                                        restic_excludes_file_path = Path(config["RESTIC_SNAPSHOT_JOB"]["restic_excludes_file_path"]),
-                                                        restic_repo_path = Path(config["RESTIC_SNAPSHOT_JOB"]["restic_repo_path"])
-                                                        )
-                )
-        return odinConfig
-    except KeyError as e:
-        raise ConfigException(f"Missing required config key. Config path: {CONFIG_PATH}.")
+    """
+    Parsed config, re-read only when the file's mtime or size changes.
+    The returned object is shared between callers; treat it as read-only.
+    """
+    st = CONFIG_PATH.stat()
+    return _load_config(st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=1)
+def _load_config(mtime_ns: int, size: int) -> OdinConfig:
+    # bytes straight to the parser: libyaml detects the encoding itself,
+    # so there is no text-layer decode into an intermediate str
+    with open(CONFIG_PATH, "rb") as f:
+        config = yaml.load(f.read(), Loader=YamlLoader)
+    return OdinConfig(config)
@@ -1,8 +1,9 @@
-from typing import Callable, Iterable, Tuple, TypeVar, Generic, List, FunctionType, NamedTuple, Dict
+from __future__ import annotations
+from typing import Callable, Iterable, Tuple, TypeVar, Generic, List, NamedTuple, Dict, Optional
+from types import FunctionType
 from dataclasses import dataclass
 from enum import Enum, auto
 from pathlib import Path
-from zmq.decorators import context
 from logging import Logger
 
 
@@ -32,6 +33,7 @@ class DecisionSignal(Enum):
     ERROR_HALT = auto()
     GENERATE_NEW_STATE = auto()
     GENERATE_NEW_STATE_HASH = auto()
+    GENERATE_NEW_STATE_JSON = auto()
     GENERATE_ERROR_TRACE = auto()
     END = auto()
 
@@ -55,7 +57,7 @@ class ProgramStage(NamedTuple):
     contract: Predicate
 
 ProgramPlan = List[ProgramStage]
-ConditionalDo = Tuple[str, Predicate, DecisionSignal]
+CompiledRule = Tuple[str, Predicate, DecisionSignal, Optional[Action], Optional[int]]
 
 class ProgramLogicRunner:
     
@@ -64,6 +66,8 @@ class ProgramLogicRunner:
         self.stage_signal_switch = {}
         self.DISPATCH : Dict[DecisionSignal, Action] = {}
         self.program_plan: ProgramPlan = []
+        self._stage_id_to_idx: Dict[str, int] = {}
+        self._compiled = None
         self.logger = None
         
     def set_logger(self, logger: Logger):
@@ -71,19 +75,44 @@ class ProgramLogicRunner:
                 
     def set_program_plan(self, program_plan : ProgramPlan):
         self.program_plan = program_plan
+        self._stage_id_to_idx = {
+            stage.stage_id: i for i, stage in enumerate(program_plan)
+        }
+        self._compiled = None
     
     def set_stage_signal_switch(self, stage_signal_switch):
         self.stage_signal_switch = stage_signal_switch
+        self._compiled = None
     
     
     def action(self, signal: DecisionSignal):
         def wrap(fn: Action):
             self.DISPATCH[signal] = fn
+            self._compiled = None
             return fn
         return wrap
     
+    def _compile(self) -> List[Tuple[CompiledRule, ...]]:
+        """
+        Flatten the plan into per-stage tuples of
+        (name, when, signal, action, switch_idx) so the run loop does no
+        dict lookups. Rebuilt lazily whenever the plan, the switches or
+        the dispatch table change.
+        """
+        compiled = []
+        for stage in self.program_plan:
+            switches = self.stage_signal_switch.get(stage.stage_id, {})
+            rules = []
+            for r in stage.rules:
+                target = switches.get(r.signal)
+                switch_idx = None if target is None else self._stage_id_to_idx[target]
+                rules.append((r.name, r.when, r.signal, self.DISPATCH.get(r.signal), switch_idx))
+            compiled.append(tuple(rules))
+        self._compiled = compiled
+        return compiled
+    
     def _get_stage_by_id(self, stage_id):
-        return next(p for p in self.program_plan if p.stage_id == stage_id)
+        return self.program_plan[self._stage_id_to_idx[stage_id]]
     
     def _check_switch_rules(self, current_stage, signal) -> Tuple[bool, ProgramStage]:
         stage_switch_rules = self.stage_signal_switch.get(current_stage.stage_id, None)
@@ -97,95 +126,79 @@ class ProgramLogicRunner:
 
     def _get_next_stage(self, current_stage : ProgramStage):
         stages : List[ProgramStage] = self.program_plan
-        i = stages.index(current_stage)
-        next_stage = stages[i+1] if i+1 < len(stages) else None
+        i = self._stage_id_to_idx[current_stage.stage_id] + 1
+        next_stage = stages[i] if i < len(stages) else None
         return next_stage
 
 
     def _exec_loop(self, current_stage, rule, trace, signal = DecisionSignal.CONTINUE):
-        
-        stage_id = current_stage.stage_id
-        trace.append(f"stage_id: {stage_id}")
-        self.logger.info(f"stage {current_stage.stage_id}")
-        # add good audit trail logic
-        rules = current_stage.rules
-        if rule is None:
-            r = rules[0]
-
-        trace.append(f"rule: {r.name}")
-        if r.when(self.context):
-            trace.append(f"rule: {r.name}: true")
-            sig = r.signal
-                
-            is_switch, new_state = self._check_switch_rules(current_stage, sig)
-            if is_switch:
-                current_stage = new_state
-                break
-            try:
-                self.DISPATCH[sig](self.context)
-            except:
-                self.logger.exception(f"failed on stage {current_stage.stage_name}")
-                
-                    
-        i = rules.index(r)
-        next_rule = rules[i+1] if i+1 < len(rules) else None
-        
-        if next_rule is not None:
-            self._exec_loop(current_stage=current_stage, rule=next_rule, trace=trace, signal=signal)
-        
-        if not current_stage.contract(self.context):
-            self._exec_loop(current_stage=current_stage, rule=None, trace=trace, signal=DecisionSignal.ENCOUNTERED_ERR)
-            pass
-        
-        if next_rule is None:
-            self._exec_loop(current_stage=self._get_next_stage(current_stage), rule=None, trace=trace, signal=signal)
+        """
+        Run the plan from `current_stage` (at `rule`, or its first rule)
+        until it falls off the last stage. A signal with a stage switch
+        jumps straight to that stage; a broken stage contract raises
+        ENCOUNTERED_ERR, which stops the run unless a switch handles it.
+        """
+        compiled = self._compiled if self._compiled is not None else self._compile()
+        stages = self.program_plan
+        ctx = self.context
+        idx = self._stage_id_to_idx[current_stage.stage_id]
+        rule_idx = 0 if rule is None else current_stage.rules.index(rule)
+        while idx is not None:
+            current_stage = stages[idx]
+            trace.append(f"stage_id: {current_stage.stage_id}")
+            self.logger.info(f"stage {current_stage.stage_id}")
+            # add good audit trail logic
+            switch_idx = None
+            for name, when, sig, action, target in compiled[idx][rule_idx:]:
+                trace.append(f"rule: {name}")
+                if not when(ctx):
+                    continue
+                trace.append(f"rule: {name}: true")
+                signal = sig
+                if target is not None:
+                    switch_idx = target
+                    break
+                if action is None:
+                    self.logger.error(f"failed on stage {current_stage.stage_name}: no action for {sig}")
+                    continue
+                try:
+                    action(ctx)
+                except:
+                    self.logger.exception(f"failed on stage {current_stage.stage_name}")
+            rule_idx = 0
 
+            if switch_idx is None and not current_stage.contract(ctx):
+                signal = DecisionSignal.ENCOUNTERED_ERR
+                trace.append(f"contract failed: {current_stage.stage_id}")
+                is_switch, switch_to = self._check_switch_rules(current_stage, signal)
+                if not is_switch:
+                    self.logger.error(f"contract failed on stage {current_stage.stage_name}")
+                    return signal
+                switch_idx = self._stage_id_to_idx[switch_to.stage_id]
 
-            
-                
-    
+            if switch_idx is not None:
+                idx = switch_idx
+            else:
+                idx = idx + 1 if idx + 1 < len(stages) else None
+        return signal
 
 
     def start_run(
                 self,
                 ):
         trace = []
-        current_stage: ProgramStage = self.program_plan[0]
-        
-
-        while True:
-            stage_id = current_stage.stage_id
-            trace.append(f"stage_id: {stage_id}")
-            self.logger.info(f"stage {current_stage.stage_id}")
-            # add good audit trail logic
-            for r in current_stage.rules:
-                trace.append(f"rule: {r.name}")
-                if r.when(self.context):
-                    trace.append(f"rule: {r.name}: true")
-                    sig = r.signal
-                        
-                    is_switch, new_state = self._check_switch_rules(current_stage, sig)
-                    if is_switch:
-                        current_stage = new_state
-                        break
-                    try:
-                        self.DISPATCH[sig](self.context)
-                    except:
-                        self.logger.exception(f"failed on stage {current_stage.stage_name}")
-                        
-                        # add good error handling
-            if not current_stage.contract(self.context):
-                pass
+        self._exec_loop(self.program_plan[0], None, trace)
+        return trace
                     
 class StageName(Enum):
-    ALL : auto()
-    LOAD : auto()
-    COMPSIG : auto()
-    CHECK_CUR: auto()
-    MAIN : auto()
-    NEW_STATE : auto()
-    ERR_HANDLING : auto()
-    END : auto()
+    ALL = auto()
+    LOAD = auto()
+    COMPSIG = auto()
+    CHECK_CUR = auto()
+    MAIN = auto()
+    NEW_STATE = auto()
+    ERR_HANDLING = auto()
+    END = auto()
                     
 
 program_stages = [
@@ -255,7 +268,8 @@ stage_signal_switch: SignalSwitch = {
 # ---- engine: pure rule loop -> signal -> dispatch; handles errors predictably ----
 def run_engine(
                 ctx: Context,
-                rules: Iterable[ConditionalDo] = decision_rules,
+                rules: Iterable[ConditionalDo],
+                dispatch: Dict[DecisionSignal, Action],
                 *,
                 max_steps: int = 100
                ) -> DecisionSignal:
@@ -265,10 +279,10 @@ def run_engine(
             if r.when(ctx):
                 ctx.trace.append(r.name)
                 sig = r.signal
-                if sig in (DecisionSignal.SKIP_COMPUTATION, DecisionSignal.ERROR_HALT):
+                if sig in (DecisionSignal.SKIP_JOB_RUN, DecisionSignal.ERROR_HALT):
                     return sig
                 try:
-                    self.DISPATCH[sig](ctx)
+                    dispatch[sig](ctx)
                 except Exception as e:
                     # normalize any action failure into ERROR_HALT
                     ctx.trace.append(f"ERROR: {sig.name} -> {e}")
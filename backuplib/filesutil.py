@@ -1,16 +1,19 @@
 from __future__ import annotations
 import fnmatch
 from pathlib import Path
-from typing import Iterable
-import json, hashlib
+from typing import Callable, Iterable, Iterator
+import functools, re
+from datetime import datetime
 import os, tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Any
-from backuplib.checksumtools import sha256_string
+from typing import List
 import errno
+# kept importable from here; the orjson-backed version lives in checksumtools
+from backuplib.checksumtools import digest, fast_digest_hex
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class QuickManifestSig:
     root: str
     exclude: List[str]
@@ -18,8 +21,12 @@ class QuickManifestSig:
     latest_mtime_ns : int
     total_bytes: int
 
+    def as_dict(self) -> dict:
+        """What asdict(self) returns, without its recursive deep copy; every field is already JSON-ready."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class QuickManifestScan:
     root: str
     exclude: List[str]
@@ -27,12 +34,106 @@ class QuickManifestScan:
     latest_mtime_ns : int
     total_bytes: int
 
+@functools.lru_cache(maxsize=64)
+def compile_exclude_patterns(patterns: tuple[str, ...]) -> re.Pattern[str] | None:
+    """A single regex matching whatever any of the fnmatch `patterns` match (None if empty)."""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+def is_excluded_str(path_str: str, exc_re: re.Pattern[str] | None) -> bool:
+    """`is_excluded` for an already-posix relative path and a compiled pattern."""
+    return exc_re is not None and exc_re.match(path_str) is not None
+
 def is_excluded(path: Path, exclude_patterns: Iterable[str] | None) -> bool:
-    path_string = path.as_posix()
     if not exclude_patterns:
         return False
-    else:
-        return any(fnmatch.fnmatch(path_string, pattern) for pattern in exclude_patterns)
+    return is_excluded_str(path.as_posix(), compile_exclude_patterns(tuple(exclude_patterns)))
+
+def build_exclude_matcher(exclude: Iterable[str] | None) -> Callable[[str], re.Match[str] | None] | None:
+    """The bound `match` of the compiled exclusion regex, or None when nothing is excluded."""
+    exc_re = compile_exclude_patterns(tuple(exclude or ()))
+    return exc_re.match if exc_re is not None else None
+
+def _scan_dir(dirpath: str, rel_base: str, matcher: Callable[[str], re.Match[str] | None] | None,
+              subdirs: list[tuple[str, str]]) -> tuple[int, int, int]:
+    """
+    (file_count, total_bytes, latest_mtime_ns) for the files directly in
+    `dirpath`; included subdirectories are appended to `subdirs`.
+    """
+    try:
+        it = os.scandir(dirpath)
+    except OSError:
+        return 0, 0, 0  # unreadable/vanished dir: os.walk skipped these too
+    # per-directory batch, reduced below with the C-level sum()/max()
+    sizes: list[int] = []
+    mtimes: list[int] = []
+    with it:
+        for entry in it:
+            rel = rel_base + entry.name
+            if matcher and matcher(rel):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # like os.walk, don't descend into symlinked dirs
+                if not entry.is_symlink():
+                    subdirs.append((entry.path, rel + "/"))
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # removed mid-scan, or a dangling symlink
+            sizes.append(st.st_size)
+            mtimes.append(st.st_mtime_ns)
+    if not sizes:
+        return 0, 0, 0
+    return len(sizes), sum(sizes), max(mtimes)
+
+def _scan_subtree(dirpath: str, rel_base: str, matcher: Callable[[str], re.Match[str] | None] | None) -> tuple[int, int, int]:
+    file_count = total_bytes = latest_mtime_ns = 0
+    # explicit stack over os.scandir: DirEntry answers is_dir from d_type and
+    # keeps rel paths as plain strings, so each file costs one stat
+    stack = [(dirpath, rel_base)]
+    while stack:
+        count, size, mtime = _scan_dir(*stack.pop(), matcher, stack)
+        file_count += count
+        total_bytes += size
+        if mtime > latest_mtime_ns:
+            latest_mtime_ns = mtime
+    return file_count, total_bytes, latest_mtime_ns
+
+def iter_files(root, matcher: Callable[[str], re.Match[str] | None] | None = None) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    (posix relative path, DirEntry) for every regular file under `root`
+    (symlinks to files included), in the same order as rglob("*").
+    Symlinked directories are not descended into. Relative paths are built
+    by prefixing as the walk descends, so no Path is made per entry, and
+    the DirEntry gives callers stat() without another lookup.
+    With a `matcher`, matching files are skipped and matching directories
+    are not entered at all, as in quick_scan_signature.
+    """
+    stack = [(os.fspath(root), "")]
+    while stack:
+        dirpath, rel_base = stack.pop()
+        try:
+            it = os.scandir(dirpath)
+        except PermissionError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                rel = rel_base + entry.name
+                if matcher and matcher(rel):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, rel + "/"))
+                elif entry.is_file():
+                    yield rel, entry
+        # pop the first subdirectory next: pre-order, like rglob
+        stack.extend(reversed(subdirs))
 
 def quick_scan_signature(root: Path, exclude: List[str]) -> QuickManifestSig:
     """
@@ -40,42 +141,51 @@ def quick_scan_signature(root: Path, exclude: List[str]) -> QuickManifestSig:
       - latest mtime (ns) of any included file
       - total file count
       - total bytes
+    Top-level subtrees are scanned concurrently; stat releases the GIL.
     """
-    latest_mtime_ns = 0
-    total_bytes = 0
-    file_count = 0
-    for dirpath, dirnames, filenames in os.walk(root):
-        rel_root = Path(dirpath).relative_to(root)
-        # prune excluded dirs (in-place)
-        new_dirnames = [d for d in dirnames if not is_excluded(rel_root / d, exclude)]
-        dirnames.clear()
-        dirnames.extend(new_dirnames)
-        for fn in filenames:
-            rel = rel_root / fn
-            if is_excluded(rel, exclude):
-                continue
-            p: Path  = Path(dirpath) / fn
-            if not p.exists():
-                continue
-            st = p.stat()
-            file_count += 1
-            total_bytes += st.st_size
-            if st.st_mtime_ns > latest_mtime_ns:
-                latest_mtime_ns = st.st_mtime_ns
+    # translate the globs once for the whole walk
+    matcher = build_exclude_matcher(exclude)
+    subtrees: list[tuple[str, str]] = []
+    parts = [_scan_dir(os.fspath(root), "", matcher, subtrees)]
+    if len(subtrees) > 1:
+        workers = min(32, (os.cpu_count() or 1) * 4, len(subtrees))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            parts.extend(ex.map(lambda t: _scan_subtree(*t, matcher), subtrees))
+    else:
+        parts.extend(_scan_subtree(*t, matcher) for t in subtrees)
     return QuickManifestSig(
         root = str(root),
         exclude = exclude,
-        file_count = file_count,
-        latest_mtime_ns = latest_mtime_ns,
-        total_bytes = total_bytes
+        file_count = sum(p[0] for p in parts),
+        latest_mtime_ns = max(p[2] for p in parts),
+        total_bytes = sum(p[1] for p in parts)
     )
 
 
 def hash_quick_manifest_scan(quick_scan : QuickManifestSig):
-    digest = f"{sha256_string(str(quick_scan.file_count))}\
-        {sha256_string(str(quick_scan.latest_mtime_ns))}\
-            {sha256_string(str(quick_scan.total_bytes))}"
-    return sha256_string(digest)
+    # change-detection only, never verified externally
+    return fast_digest_hex(f"{quick_scan.file_count}|{quick_scan.latest_mtime_ns}|{quick_scan.total_bytes}")
+
+@functools.lru_cache(maxsize=4096)
+def _local_iso_seconds(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds).isoformat()
+
+def isoformat_timestamp(ts: float) -> str:
+    """
+    datetime.fromtimestamp(ts).isoformat(), with the whole-second part
+    cached: files in a tree tend to share mtimes down to the second.
+    Microseconds are split off and rounded exactly as fromtimestamp does.
+    """
+    seconds = int(ts)  # truncates like math.modf; a negative fraction is fixed below
+    us = round((ts - seconds) * 1e6)
+    if us >= 1000000:
+        seconds += 1
+        us -= 1000000
+    elif us < 0:
+        seconds -= 1
+        us += 1000000
+    base = _local_iso_seconds(seconds)
+    return "%s.%06d" % (base, us) if us else base
 
 def file_to_lines_list(from_file: Path):
     with open(from_file, 'r') as f:
@@ -83,34 +193,42 @@ def file_to_lines_list(from_file: Path):
     return lines
 
 
-def digest(obj: Any) -> str:
-    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(data).hexdigest()
+def atomic_write_text(path: Path, text: str, *, durable: bool = True):
+    """
+    Replace `path` with `text` atomically. The temp file is written with a
+    single os.write (no 8 KiB userland buffer) and fsynced unless
+    `durable=False`.
+    """
+    atomic_write_bytes(path, text.encode("utf-8"), durable=durable)
+
 
-def atomic_write_text(path: Path, text: str):
+def atomic_write_bytes(path: Path, data: bytes, *, durable: bool = True):
+    """`atomic_write_text` for already-encoded content."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = None
+    data = memoryview(data)
+    # mkstemp opens O_CREAT|O_EXCL with mode 0o600, like NamedTemporaryFile did
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".part")
     try:
-        with tempfile.NamedTemporaryFile(
-            "w", delete=False, dir=path.parent,
-            prefix=path.name + ".", suffix=".part", encoding="utf-8"
-        ) as tmp:
-            tmp.write(text)
-            tmp.flush()
-            os.fsync(tmp.fileno())  # durability before publish
-            tmp_path = Path(tmp.name)
-        os.replace(tmp_path, path)  # atomic publish => tmp name disappears
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+            if durable:
+                os.fsync(fd)  # durability before publish
+        finally:
+            os.close(fd)
+        os.replace(tmp_name, path)  # atomic publish => tmp name disappears
     except Exception:
-        if tmp_path is not None:
-            try: os.unlink(tmp_path)   # cleanup only on failure
-            except OSError: pass
+        try: os.unlink(tmp_name)   # cleanup only on failure
+        except OSError: pass
         raise
 
 
-def preflight_check_write(target_path: Path) -> None:
+def preflight_check_write(target_path: Path, *, probe: bool = False) -> None:
     """
     Perform a preflight check to ensure the given path is writable
     and that no existing file or directory will be overwritten.
+    Writability is answered by os.access; pass `probe=True` to also
+    create and remove a test file (catches read-only mounts, ACLs).
 
     Raises:
         FileExistsError: If the target already exists.
@@ -131,6 +249,11 @@ def preflight_check_write(target_path: Path) -> None:
     if target_path.exists():
         raise FileExistsError(errno.EEXIST, f"Target already exists: {target_path}")
 
+    if not os.access(parent, os.W_OK | os.X_OK):
+        raise PermissionError(errno.EACCES, f"Directory is not writable: {parent}")
+    if not probe:
+        return
+
     # Check writability by attempting to open a test file descriptor
     try:
         with open(parent / ".__write_test__", "w") as f:
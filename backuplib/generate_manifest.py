@@ -1,129 +1,206 @@
 #!/usr/bin/env python3
 
 from pathlib import Path
+from bisect import insort
 from collections import defaultdict
-import fnmatch
 from datetime import datetime
+import re
 import yaml
-from backuplib.checksumtools import compute_sha256
+from backuplib.checksumtools import compute_sha256, hashing_pool
+from backuplib.hashcache import HashCache
+from backuplib.filesutil import is_excluded_str, build_exclude_matcher, iter_files, compile_exclude_patterns, isoformat_timestamp
 from pydeclarativelib.pydeclarativelib import safe_open_for_writing
 from backuplib.logging import setup_logging, Logger
 
+try:
+    from yaml import CSafeDumper as _YamlDumper  # libyaml C emitter
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+
 logger : Logger = setup_logging(appName = "manifest-generator")
 
+if not yaml.__with_libyaml__:
+    logger.warning("PyYAML was built without libyaml; manifest output will use the slow pure-Python emitter")
+
+_FORMATS = ("tree", "yaml", "flat")
+
 def write_manifest(root_dir, 
                    manifest_path, 
                    format_type="yaml", 
-                   exclude_patterns=None):
-    print(f"Scanning contents of {root_dir}")
+                   exclude_patterns=None,
+                   hash_cache: HashCache | None = None):
+    if format_type not in _FORMATS:
+        raise ValueError(f"Unknown format: {format_type}")
+    logger.debug("scanning contents of %s", root_dir)
     root_path = Path(root_dir).resolve()
 
-    
-    if format_type == "tree":
-        with safe_open_for_writing(to_path=manifest_path) as manifest:
+    # one atomic output file for every format; the builders stream into it
+    with safe_open_for_writing(to_path=Path(manifest_path)) as manifest:
+        if format_type == "tree":
             tree, _ = build_tree(root_path=root_path, 
                             exclude_patterns=exclude_patterns)
             for dir_path in sorted(tree):
                 indent = "  " * len(dir_path.parts)
                 manifest.write(f"{indent}{dir_path.as_posix()}/\n")
-                for name, checksum in sorted(tree[dir_path]):
+                for name, checksum in tree[dir_path]:  # kept sorted by build_tree
                     manifest.write(f"{indent}  {name}  {checksum}\n")
-    elif format_type == "yaml":
-        write_manifest_yaml(root_dir=root_dir, 
-                            manifest_path=manifest_path, 
-                            exclude_patterns=exclude_patterns)
-    elif format_type == "flat":
-        files = build_flat_list(root_path=root_path, exclude_patterns=exclude_patterns)
-        for rel_path, checksum in sorted(files):
-            manifest.write(f"{rel_path}, {checksum}\n")
-    else:
-        raise ValueError(f"Unknown format: {format_type}")
+        elif format_type == "yaml":
+            write_manifest_yaml_to(manifest, 
+                                   root_path=root_path, 
+                                   exclude_patterns=exclude_patterns,
+                                   hash_cache=hash_cache)
+        else:
+            files = build_flat_list(root_path=root_path, exclude_patterns=exclude_patterns)
+            for rel_path, checksum in sorted(files):
+                manifest.write(f"{rel_path}, {checksum}\n")
     
         
-def build_tree(root_path):
+def _sha256_or_error(file_path):
+    # pool-friendly: one unreadable file must not abort the whole map()
+    try:
+        return compute_sha256(file_path), None
+    except Exception as e:
+        return None, e
+
+def build_tree(root_path, exclude_patterns=None):
+    """
+    {parent dir: [(name, checksum), ...]} with each list kept sorted, plus
+    the paths that could not be hashed. Excluded files are never hashed.
+    """
     tree = defaultdict(list)
     errors = []
-    for file_path in root_path.rglob("*"):
-        if file_path.is_file():
-            try:
-                rel_path = file_path.relative_to(root_path)
-                parent = rel_path.parent
-                tree[parent].append((rel_path.name, compute_sha256(file_path)))
-            except Exception as e:
-                errors.append(file_path)
-                print(f"Error processing {file_path}: {e}")
+    matcher = build_exclude_matcher(exclude_patterns)
+    files = [(rel_path, entry.path) for rel_path, entry in iter_files(root_path)
+             if not (matcher and matcher(rel_path))]
+    parents: dict[str, Path] = {}  # one Path per directory, not per file
+    with hashing_pool() as ex:
+        results = ex.map(_sha256_or_error, [f[1] for f in files], chunksize=32)
+        for (rel_path, file_path), (checksum, e) in zip(files, results):
+            if e is not None:
+                errors.append(Path(file_path))
+                logger.error("error processing %s: %s", file_path, e)
+                continue
+            parent, _, name = rel_path.rpartition("/")
+            parent_path = parents.get(parent)
+            if parent_path is None:
+                parent_path = parents[parent] = Path(parent)
+            insort(tree[parent_path], (name, checksum))
     return tree, errors
 
-def is_excluded(path, exclude_patterns):
-    path_string = path.as_posix()
-    return any(fnmatch.fnmatch(path_string, pattern) for pattern in exclude_patterns)
-
 def is_excluded_cleaned(path_str, exclude_patterns):
-    #print(f"checking whether to exclude \"{path_str}\"")
-    #print("exclude patterns:")
-    #print(exclude_patterns)
-    if exclude_patterns is None:
+    if not exclude_patterns:
         return False
-
-    is_exclude = any(fnmatch.fnmatch(path_str, pattern) for pattern in exclude_patterns)
-    #print(f"excluded: {is_exclude}")
-    return is_exclude
+    return is_excluded_str(path_str, compile_exclude_patterns(tuple(exclude_patterns)))
 
 def build_flat_list(root_path, exclude_patterns):
+    candidates = []
+    matcher = build_exclude_matcher(exclude_patterns)  # globs translated once per walk
+    for rel_path, entry in iter_files(root_path):
+        if matcher and matcher(rel_path):
+            continue
+        candidates.append((rel_path, entry.path))
     files = []
-    for file_path in root_path.rglob("*"):
-        if file_path.is_file():
-            rel_path = file_path.relative_to(root_path)
-            if is_excluded(rel_path, exclude_patterns):
+    with hashing_pool() as ex:
+        results = ex.map(_sha256_or_error, [c[1] for c in candidates], chunksize=32)
+        for (rel_path, file_path), (checksum, e) in zip(candidates, results):
+            if e is not None:
+                logger.error("error processing %s: %s", file_path, e)
                 continue
-            try:
-                checksum = compute_sha256(file_path)
-                files.append((rel_path.as_posix(), checksum))
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+            files.append((rel_path, checksum))
     return files
 
-def build_file_list(root_path : Path, exclude_patterns=None):
-    print(f"building file list from root: {root_path}")
-    file_entries = []
-    print("exclude pattterns:")
-    print(exclude_patterns)
-    for file_path in root_path.rglob("*"):
-        if file_path.is_file():
-            #print(f"checking file {file_path}")
-            rel_path = file_path.relative_to(root_path).as_posix()
-            is_file_excluded = is_excluded_cleaned(rel_path, exclude_patterns)
-            
-            if is_file_excluded:
-                #print(f"excluding file {rel_path}")
-                continue
-            stat = file_path.stat()
-            size_bytes = stat.st_size
-            entry = {
-                "path": rel_path,
-                "checksum": compute_sha256(file_path),
-                "mod_time": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "size_bytes": size_bytes
-            }
-            file_entries.append(entry)
+def build_file_list(root_path : Path, exclude_patterns=None, hash_cache: HashCache | None = None):
+    """
+    Manifest entries for every included file under `root_path`. With a
+    `hash_cache`, files whose inode and stat data are unchanged are not re-read.
+    """
+    logger.debug("building file list from root: %s", root_path)
+    logger.debug("exclude patterns: %s", exclude_patterns)
+    candidates = []
+    matcher = build_exclude_matcher(exclude_patterns)  # globs translated once per walk
+    for rel_path, entry in iter_files(root_path):
+        if matcher and matcher(rel_path):
+            continue
+        candidates.append((rel_path, entry.path, entry.stat()))
+    checksums = [None] * len(candidates)
+    if hash_cache is not None:
+        for i, (_, file_path, stat) in enumerate(candidates):
+            checksums[i] = hash_cache.get(stat)
+    # walk first, then hash whatever the cache missed across cores
+    misses = [i for i, checksum in enumerate(checksums) if checksum is None]
+    with hashing_pool() as ex:
+        computed = ex.map(compute_sha256, [candidates[i][1] for i in misses], chunksize=32)
+        for i, checksum in zip(misses, computed):
+            checksums[i] = checksum
+            if hash_cache is not None:
+                hash_cache.put_if_unchanged(candidates[i][1], candidates[i][2], checksum)
+    if hash_cache is not None:
+        hash_cache.commit()
+    file_entries = [
+        {
+            "path": rel_path,
+            "checksum": checksum,
+            "mod_time": isoformat_timestamp(stat.st_mtime),
+            "size_bytes": stat.st_size
+        }
+        for (rel_path, _, stat), checksum in zip(candidates, checksums)
+    ]
     return file_entries
 
 
-def write_manifest_yaml(root_dir, manifest_path, exclude_patterns=None):
-    print(f"Scanning contents of {root_dir}")
-    root_path = Path(root_dir).resolve()
-
+# strings that can go out as a bare YAML scalar (if they also resolve to str)
+_PLAIN_SCALAR = re.compile(r"[A-Za-z0-9_./][A-Za-z0-9_./:+-]*(?<!:)")
+_YAML_RESOLVER = yaml.resolver.Resolver()
+_YAML_STR_TAG = "tag:yaml.org,2002:str"
+
+def _quote(s: str) -> str:
+    """`s` as a YAML scalar that loads back as the same str."""
+    if _PLAIN_SCALAR.fullmatch(s):
+        if _YAML_RESOLVER.resolve(yaml.ScalarNode, s, (True, False)) == _YAML_STR_TAG:
+            return s
+        return f"'{s}'"  # looks like a bool/number/timestamp; no quotes in the charset
+    # anything unusual: let libyaml pick the escapes
+    return yaml.dump(s, Dumper=_YamlDumper, default_style='"', allow_unicode=True,
+                     width=1 << 30).rstrip("\n")
+
+def write_manifest_yaml_fast(data, f):
+    """
+    Emit the manifest's fixed schema directly instead of going through
+    yaml.dump's generic representer; loads back to the same document.
+    """
+    out = [
+        f"version: {data['version']}\n",
+        f"checksum_algorithm: {_quote(data['checksum_algorithm'])}\n",
+        f"generated_at: {_quote(data['generated_at'])}\n",
+        f"origin_root: {_quote(data['origin_root'])}\n",
+    ]
+    files = data["files"]
+    if not files:
+        out.append("files: []\n")
+    else:
+        out.append("files:\n")
+        for e in files:
+            out.append(
+                f"- path: {_quote(e['path'])}\n"
+                f"  checksum: {_quote(e['checksum'])}\n"
+                f"  mod_time: {_quote(e['mod_time'])}\n"
+                f"  size_bytes: {e['size_bytes']}\n"
+            )
+    f.write("".join(out))
+
+def write_manifest_yaml_to(f, root_path: Path, exclude_patterns=None, hash_cache: HashCache | None = None):
+    """Build the YAML manifest of the already-resolved `root_path` into the open text stream `f`."""
     manifest_data = {
         "version": 1,
         "checksum_algorithm" : "sha256",
         "generated_at": datetime.now().isoformat(),
         "origin_root": str(root_path),
-        "files": build_file_list(root_path, exclude_patterns)
+        "files": build_file_list(root_path, exclude_patterns, hash_cache)
     }
+    write_manifest_yaml_fast(manifest_data, f)
 
-    #with open(manifest_path, "w", encoding="utf-8") as f:
-    with safe_open_for_writing(to_path = manifest_path) as f:
-        yaml.dump(manifest_data, f, sort_keys=False, allow_unicode=True)
+def write_manifest_yaml(root_dir, manifest_path, exclude_patterns=None, hash_cache: HashCache | None = None):
+    write_manifest(root_dir, manifest_path, "yaml", exclude_patterns, hash_cache)
 
 
 if __name__ == "__main__":
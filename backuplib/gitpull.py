@@ -21,6 +21,7 @@ Exit codes:
   0 on success, non-zero on failure. On failure, stderr explains why.
 """
 
+import functools
 import shutil
 import subprocess
 import sys
@@ -67,13 +68,21 @@ def generate_qsig(repo_path: Path) -> QuickGitRepoSig:
     return qsig
 
 
+# failures raise and are therefore never cached
+@functools.lru_cache(maxsize=1)
 def check_git_available() -> None:
     if shutil.which("git") is None:
         raise GitNotFound
 
+# work trees already confirmed by ensure_repo in this process
+_verified_repos: set[Path] = set()
+
 def ensure_repo(path: Path) -> None:
     if not path.exists():
         raise PathNotAGitRepo
+    resolved = path.resolve()
+    if resolved in _verified_repos:
+        return
     try:
         out = subprocess.run(
             ["git", "-C", str(path), "rev-parse", "--is-inside-work-tree"],
@@ -83,6 +92,7 @@ def ensure_repo(path: Path) -> None:
             sys.stderr.write(f"Error: {path} is not a Git work tree.\n")
 
             raise PathNotAGitRepo
+        _verified_repos.add(resolved)
 
     except subprocess.CalledProcessError as e:
         sys.stderr.write(f"Error: {path} is not a Git repo (rev-parse failed): {e.stderr}\n")
@@ -115,6 +125,30 @@ def detect_target_ref(repo: Path, remote: str, branch: Optional[str]) -> Tuple[O
         return None, "no_upstream"
     return upstream_ref.strip(), None
 
+def head_and_target_ref(repo: Path, remote: str, branch: Optional[str]) -> Tuple[int, str, Optional[str], str]:
+    """
+    (returncode, HEAD sha, target_ref, stderr) from a single rev-parse.
+    target_ref is remote/branch when a branch is given, else the upstream
+    of the current branch. On a non-zero returncode the values are unusable.
+    """
+    cmd = ["git", "-C", str(repo), "rev-parse", "HEAD"]
+    if not branch:
+        # flags apply to the revs after them: HEAD stays a sha, @{u} becomes a name
+        cmd += ["--abbrev-ref", "--symbolic-full-name", "@{u}"]
+    rc, out, err = run(cmd)
+    lines = out.split()
+    if rc != 0 or len(lines) != (1 if branch else 2):
+        return rc or 1, "", None, err
+    return 0, lines[0], (f"{remote}/{branch}" if branch else lines[1]), err
+
+def head_with_parents(repo: Path) -> Tuple[int, str, List[str], str]:
+    """(returncode, HEAD sha, parent shas, stderr) from one rev-list call."""
+    rc, out, err = run(["git", "-C", str(repo), "rev-list", "--parents", "-n", "1", "HEAD"])
+    shas = out.split()
+    if rc != 0 or not shas:
+        return rc or 1, "", [], err
+    return 0, shas[0], shas[1:], err
+
 def get_git_headhash(
         repo_path: Path
     ):
@@ -152,8 +186,11 @@ def git_pull(
         rec["status"] = "success"
 
 
-    # Identify target ref for comparison
-    target_ref, errcode = detect_target_ref(repo_path, remote, branch) # pyright: ignore[reportUnusedVariable]
+    # HEAD and the target ref from one rev-parse; if that fails, redo them
+    # separately so a missing upstream and a broken HEAD are told apart
+    head_rc, before_sha, target_ref, _ = head_and_target_ref(repo_path, remote, branch)
+    if head_rc != 0:
+        target_ref, errcode = detect_target_ref(repo_path, remote, branch) # pyright: ignore[reportUnusedVariable]
     if not target_ref:
         message = "No upstream set for current branch and no --branch provided.\n"
         log.error(message)
@@ -163,11 +200,12 @@ def git_pull(
 
     with tracker.record_step(run_id, "record head") as rec:
         # Record current HEAD before
-        rc, before_sha, err = git_rev_parse(repo_path, "HEAD")
-        if rc != 0:
-            rec["status"] = "failed"
-            raise GitException
-        before_sha = before_sha.strip()
+        if head_rc != 0:
+            rc, before_sha, err = git_rev_parse(repo_path, "HEAD")
+            if rc != 0:
+                rec["status"] = "failed"
+                raise GitException
+            before_sha = before_sha.strip()
         summary["before"] = before_sha
         rec["status"] = "success"
 
@@ -228,8 +266,8 @@ def git_pull(
             rec["status"] = "success"
 
     with tracker.record_step(run_id, "capture after state") as rec:
-        # After state
-        rc, after_sha, err = git_rev_parse(repo_path, "HEAD")
+        # After state (with its parents, to spot a merge commit without another call)
+        rc, after_sha, after_parents, err = head_with_parents(repo_path)
         if rc != 0:
             message = f"Failed to resolve new HEAD: {err}"
             log.error(message)
@@ -237,7 +275,6 @@ def git_pull(
             summary["result"] = "error"
             rec["message"] = message
             return rc, "", message, summary
-        after_sha = after_sha.strip()
         summary["after"] = after_sha
 
         # Classify outcome
@@ -254,7 +291,7 @@ def git_pull(
             rec["message"] = msg
         else:
             # Distinguish merge vs rebase if possible
-            if has_second_parent(repo_path, "HEAD"):
+            if len(after_parents) > 1:
                 summary["result"] = "merge"
                 rec["message"] = "merge"
             elif rebase:
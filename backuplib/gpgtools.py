@@ -1,4 +1,5 @@
 from pathlib import Path
+import functools
 import tempfile
 import subprocess
 import os
@@ -6,6 +7,21 @@ import os
 class GpgError(RuntimeError):
     pass
 
+@functools.lru_cache(maxsize=None)
+def ensure_gpg_agent(homedir: Path | None = None) -> None:
+    """
+    Start gpg-agent once per process (per homedir), so each following gpg
+    call connects to a warm agent instead of spawning and priming one.
+    Best effort: gpg still autostarts the agent if this does not work.
+    """
+    env = None
+    if homedir:
+        env = {**os.environ, "GNUPGHOME": str(homedir)}
+    try:
+        subprocess.run(["gpgconf", "--launch", "gpg-agent"], env=env, capture_output=True, check=False)
+    except OSError:
+        pass
+
 def encrypt_with_gpg_atomic(
     plaintext_path: str | Path,
     recipient: str,
@@ -75,7 +91,24 @@ def encrypt_with_gpg_atomic(
         finally: pass
         raise e
 
-class GPGError(RuntimeError): pass
+# older spelling; the same type, so `except GpgError` catches both
+GPGError = GpgError
+
+def _fsync_dir(path: Path) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # no directory fds on Windows
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+DEFAULT_PASSPHRASE_FILE = Path("/home/adam/.backup-secrets/gpg_sign.pass")
+
+@functools.lru_cache(maxsize=None)
+def _read_passphrase(passphrase_file: Path) -> bytes:
+    # read once per process, then handed to every gpg call as stdin bytes
+    return passphrase_file.read_bytes()
 
 
 def gpg_sign_detached(
@@ -86,6 +119,7 @@ def gpg_sign_detached(
     homedir: Path | None = None,    # use a dedicated keyring dir if you want
     digest_algo: str = "SHA256",
     output: Path | None = None,     # override signature path
+    passphrase_file: Path = DEFAULT_PASSPHRASE_FILE,
 ) -> Path:
     """
     Create a detached signature for `artifact` using gpg.
@@ -110,6 +144,8 @@ def gpg_sign_detached(
 
     # If you need non-interactive passphrase use loopback.
     env = os.environ.copy()
+    passphrase = _read_passphrase(Path(passphrase_file))
+    ensure_gpg_agent(Path(homedir) if homedir else None)
 
     # We write to a temp file and then atomically rename.
     output = Path(output)
@@ -121,18 +157,23 @@ def gpg_sign_detached(
     cmd += ["--output", str(tmp_path), str(artifact)]
 
     # Run gpg and capture output for logs.
-    with open("/home/adam/.backup-secrets/gpg_sign.pass","rb") as f:
-        proc = subprocess.run(cmd, stdin=f, capture_output=True, text=True)
+    proc = subprocess.run(cmd, input=passphrase, capture_output=True)
     if proc.returncode != 0:
         # Clean up temp file on failure
         try: tmp_path.unlink(missing_ok=True)
         except Exception: pass
-        raise GPGError(f"gpg sign failed ({proc.returncode}). stderr:\n{proc.stderr.strip()}")
+        stderr = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise GPGError(f"gpg sign failed ({proc.returncode}). stderr:\n{stderr}")
 
-    # fsync then atomic rename for durability
-    with open(tmp_path, "rb") as f:
-        os.fsync(f.fileno())
+    # fsync then atomic rename for durability; gpg already closed the file,
+    # so sync it through a bare fd rather than a buffered reader
+    fd = os.open(tmp_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
     os.replace(tmp_path, output)
+    _fsync_dir(tmpdir)  # make the rename itself durable
     return output
 
 
@@ -0,0 +1,111 @@
+from __future__ import annotations
+from pathlib import Path
+import os, sqlite3, time
+from backuplib.checksumtools import compute_sha256
+
+
+DEFAULT_HASH_CACHE_DB = Path.home() / ".odin_backup" / "hash_cache.sqlite"
+
+# bumped whenever the key columns change; an older table is dropped, not migrated
+_SCHEMA_VERSION = 3
+
+_SQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS file_hashes("
+    "dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL, "
+    "mtime_ns INTEGER NOT NULL, ctime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+    "PRIMARY KEY(dev, ino))"
+)
+_SQL_GET = "SELECT sha256 FROM file_hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND ctime_ns=?"
+_SQL_PUT = (
+    "INSERT INTO file_hashes(dev, ino, size, mtime_ns, ctime_ns, sha256) VALUES(?,?,?,?,?,?) "
+    "ON CONFLICT(dev, ino) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns, "
+    "ctime_ns=excluded.ctime_ns, sha256=excluded.sha256"
+)
+
+# coarsest mtime granularity we expect (FAT); see HashCache.put
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, int, int, int, int]:
+    # mtime can be set back (rsync -t, touch -r, tar), ctime cannot
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+
+class HashCache:
+    """
+    Remembers file SHA-256s keyed by (st_dev, st_ino) and checked against
+    size, mtime and ctime, so hashing an unchanged file costs a stat instead
+    of a full read. A file replaced or rewritten in place gets a new inode
+    or a new ctime, so it always misses.
+    Writes are committed on `commit` / `close`.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_HASH_CACHE_DB):
+        self.opened_ns = time.time_ns()
+        self.db = db_path
+        self.db.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db), cached_statements=256)
+        self._conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+        )
+        with self._conn as c:
+            if c.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                c.execute("DROP TABLE IF EXISTS file_hashes")
+                c.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+            c.execute(_SQL_CREATE)
+
+    def get(self, st: os.stat_result) -> str | None:
+        row = self._conn.execute(_SQL_GET, _stat_key(st)).fetchone()
+        return row[0] if row else None
+
+    def put(self, st: os.stat_result, sha256: str) -> None:
+        """
+        Remember `sha256` for the file `st` was taken from. Like git's
+        "racy clean" rule, a file stamped within one tick of this cache being
+        opened is not stored: it could still change without its stat data
+        moving.
+        """
+        if max(st.st_mtime_ns, st.st_ctime_ns) >= self.opened_ns - _RACY_WINDOW_NS:
+            return
+        self._conn.execute(_SQL_PUT, (*_stat_key(st), sha256))
+
+    def get_or_compute(self, path: str | Path) -> str:
+        """Hex SHA-256 of `path`, from the cache when its stat data is unchanged."""
+        st = os.stat(path)
+        cached = self.get(st)
+        if cached is not None:
+            return cached
+        sha256 = compute_sha256(path)
+        self.put_if_unchanged(path, st, sha256)
+        return sha256
+
+    def put_if_unchanged(self, path: str | Path, st: os.stat_result, sha256: str) -> None:
+        """`put`, but only if `path` still matches `st` (it did not change while it was read)."""
+        try:
+            after = os.stat(path)
+        except OSError:
+            return
+        if _stat_key(after) == _stat_key(st):
+            self.put(st, sha256)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+    def __enter__(self) -> "HashCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def cached_compute_sha256(path: str | Path, cache: HashCache | None = None) -> str:
+    """`compute_sha256` backed by a HashCache (the default one if none is given)."""
+    if cache is not None:
+        return cache.get_or_compute(path)
+    with HashCache() as cache:
+        return cache.get_or_compute(path)
@@ -2,24 +2,29 @@
 from backuplib.configloader import OdinConfig, load_config
 from backuplib.checksumtools import sha256_string
 from pathlib import Path
-import json
+import json, os
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
 
 odinConfig: OdinConfig = load_config()
 
+# ((mtime_ns, size), parsed json) of the last manifest state file read
 stored_manifest_state_json = None
 
 
 def load_manifest_state():
-    if stored_manifest_state_json is not None:
-        return stored_manifest_state_json
+    """The manifest state json, re-parsed only when the file's mtime or size changes."""
+    global stored_manifest_state_json
     manifest_dir = odinConfig.manifest_dir
     manifest_state_name = odinConfig.manifest_state_name
     manifest_state_path = manifest_dir / manifest_state_name
+    st = os.stat(manifest_state_path)
+    key = (st.st_mtime_ns, st.st_size)
+    if stored_manifest_state_json is not None and stored_manifest_state_json[0] == key:
+        return stored_manifest_state_json[1]
     with open(manifest_state_path, 'r', encoding="utf-8") as f:
         manifest_state_json = json.load(f)
-        stored_manifest_state_json = manifest_state_json
+    stored_manifest_state_json = (key, manifest_state_json)
     return manifest_state_json
     
 def manifest_state_input_sig():
@@ -31,21 +36,9 @@ def manifest_state_output_sig():
     return manifest_state_json["output_sig_hex"]
 
 
-def _sorted(x):
-    if (isinstance(x, list)):
-        sorted_list = list.sorted()
-        return sorted_list
-    return x
-
 def hash_config(config: dict) -> str:
-    config_keys = config.keys().sorted()
-
-    canon_config = {}
-    for k in config_keys:
-        val = config(k)
-        canon_config[k] = _sorted(val)
-        canon_config[k] = config[k]
-        config_json = json.dump(canon_config)
+    """SHA-256 of `config` as canonical JSON (sorted keys, compact); non-JSON values go through str()."""
+    config_json = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
     return sha256_string(config_json)
 
 
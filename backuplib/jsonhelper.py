@@ -2,7 +2,12 @@ from dataclasses import dataclass, asdict, is_dataclass
 from pathlib import Path
 from datetime import date, datetime
 from enum import Enum
-import json
+import json, re
+
+try:
+    import orjson
+except ImportError:  # optional speedup; EnhancedJSONEncoder is the reference
+    orjson = None
 
 class EnhancedJSONEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -23,4 +28,40 @@ class EnhancedJSONEncoder(json.JSONEncoder):
             return obj.value  # or obj.name
 
         # Let the base class raise the TypeError for the rest
-        return super().default(obj)
\ No newline at end of file
+        return super().default(obj)
+
+
+def _orjson_default(obj):
+    # orjson already covers dataclasses, datetime/date and Enum in C
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError
+
+
+# pretty output has to match json.dumps(sort_keys=True, indent=2) byte for
+# byte. orjson never escapes non-ASCII or DEL, spells exponent floats
+# differently and writes NaN/Infinity as null; any output that might hold
+# one of those is redone with json
+_PRETTY_MISMATCH = re.compile(rb"[^\x00-\x7e]|\de|0\.0000|null")
+
+def dumps(obj, *, pretty: bool = False) -> bytes:
+    """
+    Compact UTF-8 JSON for `obj`, understanding the same extra types as
+    EnhancedJSONEncoder. Uses orjson when it is installed and can encode
+    `obj` (e.g. it rejects non-str dict keys), the stdlib otherwise.
+    `pretty` sorts keys and indents by two spaces, for files people read.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2 if pretty else 0
+        try:
+            out = orjson.dumps(obj, default=_orjson_default, option=option)
+        except orjson.JSONEncodeError:
+            out = None
+        if out is not None and not (pretty and _PRETTY_MISMATCH.search(out)):
+            return out
+    if pretty:
+        # json's default ensure_ascii escaping: the bytes state files have always had
+        text = json.dumps(obj, cls=EnhancedJSONEncoder, sort_keys=True, indent=2)
+    else:
+        text = json.dumps(obj, cls=EnhancedJSONEncoder, separators=(",", ":"), ensure_ascii=False)
+    return text.encode("utf-8")
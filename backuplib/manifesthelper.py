@@ -3,14 +3,18 @@
 from __future__ import annotations
 from pathlib import Path
 from datetime import datetime
-from backuplib.checksumtools import compute_sha256
+from backuplib.checksumtools import compute_sha256, sha256_backend, hashing_pool
 from backuplib.logging import setup_logging, Logger
-from backuplib.filesutil import is_excluded
-from pydeclarativelib.pydeclarativelib import IterConsumable, IterConsumable
-from typing import List, TypedDict, Iterator, Any
+from backuplib.filesutil import build_exclude_matcher, iter_files, isoformat_timestamp
+from typing import IO, List
 import json
 import os
 
+_MANIFEST_BUFFER_SIZE = 1 << 20
+
+# manifest lines are joined and written this many at a time
+_WRITE_BATCH = 1024
+
 class ManifestFileCreationFailureException(Exception):
     """Could not create the manifest files."""
 
@@ -20,99 +24,132 @@ class CouldNotGetFileInfoException(Exception):
 class CouldNotWriteFileInfoException(Exception):
     """Encountered an exception while trying to write file info."""
 
+# the fixed schema, laid out exactly as json.dumps(info, sort_keys=True)
+# wrote the old per-file dict; checksum and mod_time never need escaping
+_FILE_INFO_LINE = '{"checksum": "%s", "mod_time": "%s", "path": %s, "size_bytes": %d}'
+
+def get_file_info_line(file_path : str | Path, rel_path : str | Path, stat : os.stat_result | None = None) -> str:
+    """The manifest JSON line (without newline) for one file."""
+    try:
+        if stat is None:
+            stat = os.stat(file_path)
+        return _FILE_INFO_LINE % (
+            compute_sha256(file_path),
+            isoformat_timestamp(stat.st_mtime),
+            json.dumps(str(rel_path)),
+            stat.st_size,
+        )
+    except Exception as e:
+        raise CouldNotGetFileInfoException() from e
+
+def _file_info_or_error(job : tuple[str, str, os.stat_result]) -> tuple[str | None, Exception | None]:
+    # module-level and exception-free so it can be mapped over a process pool
+    try:
+        return get_file_info_line(file_path=job[0], rel_path=job[1], stat=job[2]), None
+    except Exception as e:
+        return None, e
+
+def _create_empty(path : Path) -> bool:
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
 def write_manifest(root_dir : str, 
                    manifest_path_str : str,
                    manifest_info_path_str : str,
                    exclude_patterns : List[str] | None = None):
 
-    root_path = Path(root_dir).resolve()
+    # the walk works on plain strings; no Path is built per file
+    root_str = os.path.realpath(root_dir)
+    matcher = build_exclude_matcher(exclude_patterns)
     logger : Logger = setup_logging(appName = "manifest-generator")
+    logger.debug("sha256 backend: %s", sha256_backend())
 
-    class FileInfo(TypedDict):
-        path: str
-        checksum: str
-        mod_time: str
-        size_bytes: int
+    def append_file_info_line(pending : List[str], line : str) -> None:
+        logger.debug("appending %s to %s", line, manifest_path)
+        pending.append(line)
 
-    def get_file_info(file_path : Path, rel_path : Path) -> FileInfo:
+    def write_pending_lines(manifest_file : IO[str], pending : List[str]) -> None:
+        # one write call per batch instead of one per line
+        if not pending:
+            return
         try:
-            stat: os.stat_result = file_path.stat()
-            size_bytes : int = stat.st_size
-            info : FileInfo = {
-                "path": str(rel_path),
-                "checksum": compute_sha256(file_path),
-                "mod_time": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "size_bytes": size_bytes
-            }
-            return info
-        except Exception as e:
-            raise CouldNotGetFileInfoException() from e
-
-    def preflight_check(manifest_path : Path, manifest_info_path: Path):
-        if manifest_path.exists() or manifest_info_path.exists():
-            return False
-        return True
-
-
-    def append_file_info_line(manifest_path : Path, info : FileInfo) -> None:
-        print("attempting to append information")
-        try:
-            file_info_json_str = json.dumps(info, sort_keys=True)
-            print(f"attempting to append {file_info_json_str} to file {manifest_path.as_posix()}")
-            with open(manifest_path, 'a') as f:
-                f.write(file_info_json_str + "\n")
-                f.flush()
+            pending.append("")
+            manifest_file.write("\n".join(pending))
         except Exception as e:
             raise CouldNotWriteFileInfoException() from e
+        finally:
+            pending.clear()
         
 
     def create_new_manifest_files(manifest_path : Path, manifest_info_path: Path) -> bool:
+        # O_EXCL does the exists check and the create in one atomic step;
+        # False if either file was already there, and then neither is left
+        # behind: a manifest made just before the info file failed is removed
         try:
-            if preflight_check(manifest_path=manifest_path, manifest_info_path=manifest_info_path):
-                with open(manifest_path, 'w') as f:
-                    f.write("")
-                    f.flush()
-                with open(manifest_info_path, 'w') as f:
-                    f.write("")
-                    f.flush()
-                return True
+            if not _create_empty(manifest_path):
+                return False
+            try:
+                created = _create_empty(manifest_info_path)
+            except BaseException:
+                os.unlink(manifest_path)
+                raise
+            if not created:
+                os.unlink(manifest_path)
+            return created
         except Exception as e:
             raise ManifestFileCreationFailureException() from e
 
 
-    def process_file(file_path: Path) -> None:
-        print(f"processing {file_path.as_posix()}")
-        if file_path.is_file():
-            rel_path = file_path.relative_to(root_path)
-            if is_excluded(rel_path, exclude_patterns):
-                print("excluded")
-                return
-            
-            try:
-                file_info : FileInfo = get_file_info(file_path=file_path, rel_path=rel_path)
-                print("file info")
-                print(file_info)
-                append_file_info_line(manifest_path=manifest_path, info=file_info)
-
-            except CouldNotGetFileInfoException:
-                logger.exception(f"could not get information for file {str(rel_path)}")
-                # handle file err
-            except CouldNotWriteFileInfoException:
-                logger.exception(f"could not write information of file {str(rel_path)} to {manifest_path.as_posix()}")
-            except Exception:
-                logger.exception(f"could not process file {str(rel_path)}")
-
-    def process_files(root_path: Path):
-        fileGenerator : Iterator[Any] = root_path.rglob("*")
-        iter_consume : IterConsumable = IterConsumable(fileGenerator)
-        iter_consume.for_each(process_file)
+    def select_file(rel_path: str, entry: os.DirEntry) -> os.stat_result | None:
+        logger.debug("processing %s", entry.path)
+        try:
+            # cached on the DirEntry; rglob + Path.stat() paid for two stats
+            return entry.stat()
+        except OSError as e:
+            logger.error("could not get information for file %s", rel_path, exc_info=e)
+            return None
+
+    def process_file(pending: List[str], rel_path: str, line: str | None, error: Exception | None) -> None:
+        if error is not None:
+            logger.error("could not get information for file %s", rel_path, exc_info=error)
+            return
+        append_file_info_line(pending=pending, line=line)
+
+    def process_files(root_str: str, manifest_file: IO[str]):
+        # walk and filter here; hash across cores; write back in walk order
+        jobs : List[tuple[str, str, os.stat_result]] = []
+        # excluded files and whole excluded directories never reach here
+        for rel_path, entry in iter_files(root_str, matcher):
+            stat = select_file(rel_path, entry)
+            if stat is not None:
+                jobs.append((entry.path, rel_path, stat))
+        pending : List[str] = []
+        with hashing_pool() as ex:
+            results = ex.map(_file_info_or_error, jobs, chunksize=32)
+            for (_, rel_path, _), (line, error) in zip(jobs, results):
+                process_file(pending, rel_path, line, error)
+                if len(pending) >= _WRITE_BATCH:
+                    write_pending_lines(manifest_file, pending)
+        write_pending_lines(manifest_file, pending)
 
     
     manifest_path = Path(manifest_path_str).resolve()
     manifest_info_path = Path(manifest_info_path_str).resolve()
-    create_new_manifest_files(manifest_path=manifest_path, manifest_info_path=manifest_info_path)
-    process_files(root_path=root_path)
-    print(f"Manifest written to {args.output}")
+    if not create_new_manifest_files(manifest_path=manifest_path, manifest_info_path=manifest_info_path):
+        # never append to a manifest left by an earlier run
+        raise ManifestFileCreationFailureException(
+            f"manifest files already exist: {manifest_path}, {manifest_info_path}"
+        )
+    # one handle for the whole run; flushed and synced once at the end
+    with open(manifest_path, 'a', buffering=_MANIFEST_BUFFER_SIZE) as manifest_file:
+        process_files(root_str=root_str, manifest_file=manifest_file)
+        manifest_file.flush()
+        os.fsync(manifest_file.fileno())
+    logger.info("Manifest written to %s", manifest_path)
 
 
 if __name__ == "__main__":
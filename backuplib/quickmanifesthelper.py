@@ -1,9 +1,2 @@
-from dataclasses import dataclass, List
-
-@dataclass
-class QuickManifestSig:
-    root: str
-    exclude: List[str]
-    file_count: int
-    latest_mtime_ns : int
-    total_bytes: int
\ No newline at end of file
+# QuickManifestSig lives in filesutil; re-exported here for old imports
+from backuplib.filesutil import QuickManifestSig
@@ -12,31 +12,34 @@ def run_once(func):
     Thread-safe.
     """
     lock = threading.Lock()
-    state = {"called": False}
+    called = threading.Event()
+
+    def _claim():
+        # after the first call this is a flag read; the lock only guards the first claim
+        if called.is_set():
+            raise AlreadyCalledError(f"{func.__name__}() was called more than once")
+        with lock:
+            if called.is_set():
+                raise AlreadyCalledError(f"{func.__name__}() was called more than once")
+            called.set()
 
     if asyncio.iscoroutinefunction(func):
         @functools.wraps(func)
         async def awrapper(*args, **kwargs):
-            with lock:
-                if state["called"]:
-                    raise AlreadyCalledError(f"{func.__name__}() was called more than once")
-                state["called"] = True
+            _claim()
             return await func(*args, **kwargs)
         wrapper = awrapper
     else:
         @functools.wraps(func)
         def swrapper(*args, **kwargs):
-            with lock:
-                if state["called"]:
-                    raise AlreadyCalledError(f"{func.__name__}() was called more than once")
-                state["called"] = True
+            _claim()
             return func(*args, **kwargs)
         wrapper = swrapper
 
     # Optional: test helper to reset between unit tests
     def _reset_run_once():
         with lock:
-            state["called"] = False
+            called.clear()
     wrapper.reset_run_once = _reset_run_once
 
     return wrapper
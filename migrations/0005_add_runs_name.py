@@ -12,11 +12,14 @@ def migrate(conn: sqlite3.Connection):
     if "name" not in cols:
         conn.execute("ALTER TABLE runs ADD COLUMN name TEXT")
 
-    # 2) Backfill from meta_json.job, ignoring malformed JSON
+    # 2) Backfill from meta_json.job, ignoring malformed JSON.
+    #    Rows whose text can't hold a "job" key are filtered in SQLite,
+    #    so only candidates are decoded here.
     cur = conn.execute("""
         SELECT rowid, meta_json
         FROM runs
         WHERE name IS NULL AND meta_json IS NOT NULL
+          AND CAST(meta_json AS TEXT) LIKE '%"job"%'
     """)
 
     updates = []
@@ -29,6 +32,8 @@ def migrate(conn: sqlite3.Connection):
                 mj = mj.decode("utf-8", errors="ignore")
             except Exception:
                 continue
+        if '"job"' not in mj:
+            continue
         try:
             obj = json.loads(mj)
         except Exception:
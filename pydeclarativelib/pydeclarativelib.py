@@ -1,10 +1,11 @@
 
 from pathlib import Path
 import tempfile
+import hashlib
 import os
 import tarfile
 from typing import List, Any, Iterator, Callable, IO
-from fnmatch import fnmatch
+from fnmatch import fnmatchcase
 from contextlib import contextmanager
 
 
@@ -60,7 +61,12 @@ def _build_safe(at: Path, in_binary: bool = False):
 
 def _path_matches_any(rel: str, patterns: list[str]) -> bool:
     """Match POSIX-style relative path against glob patterns (supports **)."""
-    return any(fnmatch(rel, pat) for pat in patterns)
+    # plain loop instead of any(<genexpr>); fnmatchcase skips os.path.normcase,
+    # a no-op on the POSIX paths we build anyway
+    for pat in patterns:
+        if fnmatchcase(rel, pat):
+            return True
+    return False
 
 def _create_tarball(
                     fileobj : IO[Any] | None,
@@ -83,17 +89,34 @@ def _create_tarball(
             tar.add(p, arcname=rel)
 
 
-def make_a_tarball(of_dir: Path, at : Path, excluding : List[str]):
+class _HashingWriter():
+    """Write-through wrapper that feeds every byte written into a SHA-256."""
+    def __init__(self, raw : IO[bytes]) -> None:
+        self.raw = raw
+        self.hasher = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return self.raw.write(data)
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+
+def make_a_tarball(of_dir: Path, at : Path, excluding : List[str]) -> str:
+    """Build the tarball and return the hex SHA-256 of the bytes written."""
     target_dir = of_dir
     tarball_path = at
     input_path = target_dir
     with _build_safe(at=tarball_path, in_binary=True) as f:
+        out = _HashingWriter(f)
         _create_tarball(
-                        fileobj = f,
+                        fileobj = out,
                         input_path = input_path, 
                         exclude_patterns = excluding,
                         gz = True
                         )
+    return out.hasher.hexdigest()
         
 @contextmanager
 def safe_open_for_writing(to_path: Path):
@@ -105,10 +128,10 @@ def safe_open_for_writing(to_path: Path):
             "w", delete=False, dir=path.parent,
             prefix=path.name + ".", suffix=".part", encoding="utf-8"
         ) as tmp:
+            tmp_path = Path(tmp.name)
             yield tmp
             tmp.flush()
             os.fsync(tmp.fileno())  # durability before publish
-            tmp_path = Path(tmp.name)
         os.replace(tmp_path, path)  # atomic publish => tmp name disappears
     except Exception:
         if tmp_path is not None:
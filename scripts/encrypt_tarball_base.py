@@ -11,6 +11,7 @@ from backuplib.jobstatehelper import get_upstream_hash, get_hash
 from backuplib.filesutil import atomic_write_text
 from backuplib.audit import Tracker, RunSignature
 from backuplib.backupjob import BackupJobResult
+from backuplib.gpgtools import GPGError
 import json
 import shutil
 import uuid
@@ -25,10 +26,6 @@ utc_timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
 tracker = Tracker()
 
 
-class GPGError(RuntimeError):
-    pass
-
-
 def write_state_file(statefile_path: Path, new_run_signature: str, upstream_hash : str):
     try:
         logger.info("writing state file for odin encrypted tarball job")
@@ -13,7 +13,7 @@ Usage:
 import sys
 import pysqlite3 as sqlite3
 print("sqlite_version():", sqlite3.sqlite_version)
-import argparse, sys, time, importlib.util
+import argparse, sys, time, importlib.util, functools
 from pathlib import Path
 from typing import List, Tuple
 
@@ -52,17 +52,28 @@ def list_migrations(dir_path: Path) -> List[Tuple[int, str, Path]]:
 def applied_map(conn: sqlite3.Connection):
     return {row[0]: row[1] for row in conn.execute("SELECT id, name FROM schema_migrations")}
 
-def apply_sql(conn: sqlite3.Connection, path: Path):
-    sql = path.read_text()
-    conn.executescript(sql)
+# main(argv) can be driven repeatedly in one process; read/exec each
+# migration file once per version of it rather than on every call
+@functools.lru_cache(maxsize=None)
+def _load_sql(path: Path, mtime_ns: int) -> str:
+    return path.read_text()
 
-def apply_py(conn: sqlite3.Connection, path: Path):
+@functools.lru_cache(maxsize=None)
+def _load_py(path: Path, mtime_ns: int):
     spec = importlib.util.spec_from_file_location(path.stem, path)
     mod = importlib.util.module_from_spec(spec)
     assert spec and spec.loader
     spec.loader.exec_module(mod)
     if not hasattr(mod, "migrate"):
         raise RuntimeError(f"{path.name} must define a migrate(conn) function")
+    return mod
+
+def apply_sql(conn: sqlite3.Connection, path: Path):
+    sql = _load_sql(path, path.stat().st_mtime_ns)
+    conn.executescript(sql)
+
+def apply_py(conn: sqlite3.Connection, path: Path):
+    mod = _load_py(path, path.stat().st_mtime_ns)
     mod.migrate(conn)
 
 def apply_one(conn, num, name, path):
@@ -102,6 +113,11 @@ def cmd_up(conn: sqlite3.Connection, dir_path: Path):
     ensure_meta(conn)
     migs = list_migrations(dir_path)
     applied = applied_map(conn)
+    # table rebuilds (0006) sort and copy whole tables; give them memory.
+    # Both pragmas last only for this connection. synchronous is left
+    # alone: each migration is one transaction, so it syncs once anyway.
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")  # 64 MiB
     for num, name, path in migs:
         if num in applied:
             continue
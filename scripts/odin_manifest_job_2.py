@@ -8,6 +8,7 @@ from backuplib.jobstatehelper import get_hash, get_upstream_hash
 from backuplib.backupjob import BackupJobResult
 from backuplib.audit import Tracker, RunSignature
 from backuplib.checksumtools import sha256_file
+from backuplib.hashcache import HashCache
 from pydeclarativelib.pydeclarativelib import write_text_atomic
 import datetime
 import json
@@ -90,12 +91,14 @@ def run(parent_id : str | None = None):
 
         def write_the_manifest(manifest_path: Path):
             logger.info("starting to generate manifest")
-            write_manifest(
-                                root_dir=odin_config.repo_dir, 
-                                manifest_path = manifest_path, 
-                                format_type="yaml", 
-                                exclude_patterns=odin_config.manifest_exclusions
-                            )
+            with HashCache(odin_config.manifest_dir / "sha_cache.db") as hash_cache:
+                write_manifest(
+                                    root_dir=odin_config.repo_dir, 
+                                    manifest_path = manifest_path, 
+                                    format_type="yaml", 
+                                    exclude_patterns=odin_config.manifest_exclusions,
+                                    hash_cache=hash_cache
+                                )
             logger.info(f"generated manifest at {manifest_path}")
         
 
@@ -3,10 +3,12 @@ from pathlib import Path
 import os, tempfile
 from backuplib.generate_manifest import write_manifest
 from backuplib.audit import Tracker
-from backuplib.filesutil import quick_scan_signature, atomic_write_text, QuickManifestSig
+from backuplib.filesutil import quick_scan_signature, atomic_write_bytes, QuickManifestSig
+from backuplib import jsonhelper
 from backuplib.checksumtools import compute_sha256, digest
+from backuplib.hashcache import HashCache
 from backuplib.exceptions import ConfigException
-from backuplib.configloader import OdinConfig, load_config
+from backuplib.configloader import OdinConfig, load_config, YamlLoader
 from backuplib.logging import setup_logging, WithContext
 import json
 from zoneinfo import ZoneInfo
@@ -18,6 +20,7 @@ import logging
 import uuid
 import yaml
 from logging import Logger
+
 import contextvars
 from enum import Enum
 current_tracker = contextvars.ContextVar("current_tracker", default=None)
@@ -31,8 +34,8 @@ CONFIG_PATH = Path("~/.config/odin/odin_run_manifest_job.yaml").expanduser()
 
 
 
-with open(CONFIG_PATH, "r") as f:
-    config = yaml.safe_load(f)
+with open(CONFIG_PATH, "rb") as f:
+    config = yaml.load(f.read(), Loader=YamlLoader)
 
 try:
     REPO_DIR = Path(config["REPO_DIR"])
@@ -106,7 +109,7 @@ def write_manifest_state_file(
                 output_sig_hex=out_sha,
                 timestamp=datetime.now(local_zone).strftime("%Y-%m-%d_%H:%M:%S")
             )
-            atomic_write_text(state_path, json.dumps(asdict(state_doc), sort_keys=True, indent=2))
+            atomic_write_bytes(state_path, jsonhelper.dumps(asdict(state_doc), pretty=True))
             rec["status"] = "success"
             logger.info(f"odin manifest job completed successfully; output at {OUTPUT_PATH}")
             tracker.finish_run(run_id, "success", 
@@ -134,6 +137,10 @@ def get_manifest_path(odinConfig : OdinConfig) -> Path:
 def get_state_path(odinConfig : OdinConfig) -> Path:
     return odinConfig.manifest_dir / odinConfig.manifest_state_name
 
+def open_hash_cache(odinConfig : OdinConfig) -> HashCache:
+    """The sha cache for repo files; the manifest's own self-check hash never goes through it."""
+    return HashCache(odinConfig.manifest_dir / "sha_cache.db")
+
 
 class JobState(Enum):
     STATE_EXPIRED = 1
@@ -276,7 +283,7 @@ def odin_run_manifest_job():
                                                 root = odinConfig.repo_dir, 
                                                 exclude=odinConfig.manifest_exclusions
                                             )
-        initial_signature_hash = digest(asdict(quick_signature))
+        initial_signature_hash = digest(quick_signature.as_dict())
         logger.info(f"computed initial quick-signature hash: {initial_signature_hash}")
         current_manifest_sig = compute_sha256(manifest_path)
         manifestInfo = ManifestInfo(
@@ -354,12 +361,14 @@ def odin_run_manifest_job():
 
     def write_the_manifest(manifest_path: Path):
         logger.info("starting to generate manifest")
-        write_manifest(
-                            root_dir=odinConfig.repo_dir, 
-                            manifest_path = manifest_path, 
-                            format_type="yaml", 
-                            exclude_patterns=odinConfig.manifest_exclusions
-                        )
+        with open_hash_cache(odinConfig) as hash_cache:
+            write_manifest(
+                                root_dir=odinConfig.repo_dir, 
+                                manifest_path = manifest_path, 
+                                format_type="yaml", 
+                                exclude_patterns=odinConfig.manifest_exclusions,
+                                hash_cache=hash_cache
+                            )
         logger.info(f"generated manifest at {manifest_path}")
 
     def generate_manifest_state_file():
@@ -372,7 +381,7 @@ def odin_run_manifest_job():
             output_signature_hash=out_sha,
             timestamp=datetime.now(local_zone).strftime("%Y-%m-%d_%H:%M:%S")
         )
-        atomic_write_text(state_path, json.dumps(asdict(state_doc), sort_keys=True, indent=2))
+        atomic_write_bytes(state_path, jsonhelper.dumps(asdict(state_doc), pretty=True))
         logger.info(f"odin manifest job completed successfully; output at {OUTPUT_PATH}")
 
 
@@ -46,9 +46,9 @@ def make_idempotent_copy(
 def create_tarball( 
                 repo_dir: Path, 
                 exclude_patterns: list[str], 
-                dest_tar_gz: Path) -> None:
-    make_a_tarball(of_dir= repo_dir, at=dest_tar_gz, excluding=exclude_patterns)
-    return {"success": True}
+                dest_tar_gz: Path):
+    tarball_hash = make_a_tarball(of_dir= repo_dir, at=dest_tar_gz, excluding=exclude_patterns)
+    return {"success": True, "data": tarball_hash}
 
 
 @audited_by(tracker, with_step_name="write state file", and_run_id = run_id)
@@ -69,9 +69,10 @@ class IdempotentStateData:
 @with_try_except_and_trace(if_success_then_message=None, if_failed_then_message=None, with_trace=trace)
 def write_idempotent_state(
                                 tarball_idempotent_path : Path,
-                                upstream_hash : str
+                                upstream_hash : str,
+                                tarball_hash : str | None = None
                            ):
-    _, hash = write_sha256_sidecar(tarball_idempotent_path)
+    _, hash = write_sha256_sidecar(tarball_idempotent_path, digest=tarball_hash)
     idempotent_tar_path = odin_cfg.tarball_dir_idempotent
     state_filename = odin_cfg.tarball_state_filename
     statefile_path = idempotent_tar_path / state_filename
@@ -197,7 +198,7 @@ def main(parent_id : str = None):
         tarball_idempotent_path = odin_cfg.tarball_dir_idempotent / tarball_idempotent_filename
 
 
-        create_tarball(
+        tarball_res = create_tarball(
                             repo_dir=repo_dir,
                             exclude_patterns=exclude_list,
                             dest_tar_gz=tarball_path
@@ -214,7 +215,9 @@ def main(parent_id : str = None):
     
         idempotent_state_res = write_idempotent_state(
                                 tarball_idempotent_path = tarball_idempotent_path,
-                                upstream_hash = upstream_hash
+                                upstream_hash = upstream_hash,
+                                # the idempotent copy is byte-identical, so reuse the hash taken while writing
+                                tarball_hash = tarball_res["data"]
                               )
         idempotent_state_data : IdempotentStateData = idempotent_state_res["data"]
 
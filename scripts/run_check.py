@@ -16,7 +16,24 @@ def q(conn, sql, args=()):
     for row in cur: yield row
 
 def main():
-    conn = sqlite3.connect(DB)
+    # report only reads; a read-only handle never opens a write transaction
+    conn = sqlite3.connect(f"file:{DB}?mode=ro", uri=True)
+    try:
+        lines = collect(conn)
+    finally:
+        conn.close()
+
+    text = "\n".join(lines) + "\n"
+
+    tmp.write_text(text)
+
+    # Ensure readable by node_exporter; 0644 is fine (read-only needed)
+    os.chmod(tmp, 0o644)
+
+    # Atomic publish
+    os.replace(tmp, out)
+
+def collect(conn) -> list[str]:
     lines = []
 
     # 1) last run status per job (1=ok, 0=fail)
@@ -55,15 +72,7 @@ def main():
     """):
         lines.append(f'odin_last_run_duration_seconds{{job="{job}"}} {dur}')
 
-    text = "\n".join(lines) + "\n"
-
-    tmp.write_text(text)
-
-    # Ensure readable by node_exporter; 0644 is fine (read-only needed)
-    os.chmod(tmp, 0o644)
-
-    # Atomic publish
-    os.replace(tmp, out)
+    return lines
 
 if __name__ == "__main__":
     try:
@@ -47,7 +47,7 @@ def perform_initial_job_setup(odin_cfg: OdinConfig,
     qsig: QuickManifestSig = quick_scan_signature(
         root=odin_cfg.repo_dir, exclude=odin_cfg.manifest_exclusions
     )
-    initial_signature_hash = digest(asdict(qsig))
+    initial_signature_hash = digest(qsig.as_dict())
     
     current_manifest_sig = compute_sha256(manifest_path) if manifest_path.exists() else None
 
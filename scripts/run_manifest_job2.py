@@ -17,7 +17,7 @@ Behavior:
 - Load previous manifest state if present.
 - Decide: SKIP vs REBUILD by comparing init quick signature + last output hash vs current.
 - If REBUILD/NOT_FOUND/FAILED: write fresh manifest, then write state json.
-- Always record audit steps.
+- Record audit steps for every run that builds; a skipped run only logs.
 
 Idempotency logic:
 - If the quick-signature (input fingerprint) matches the one in state AND
@@ -26,7 +26,7 @@ Idempotency logic:
 - Otherwise, we rebuild.
 """
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Optional
@@ -47,6 +47,7 @@ from backuplib.filesutil import (
     QuickManifestSig,
 )
 from backuplib.checksumtools import compute_sha256, digest
+from backuplib.hashcache import HashCache
 from backuplib.configloader import OdinConfig, load_config
 from backuplib.logging import setup_logging, WithContext
 
@@ -72,6 +73,11 @@ def _now_tz(tz: ZoneInfo) -> str:
     return datetime.now(tz).strftime("%Y-%m-%d_%H:%M:%S")
 
 
+# algorithm behind output_signature_hash; recorded in the state file so a
+# future change of algorithm reads old hashes as missing, not as mismatched
+OUTPUT_SIGNATURE_ALGO = "sha256"
+
+
 @dataclass
 class ManifestState:
     init_signature_hash: str
@@ -83,6 +89,9 @@ class ManifestState:
         # Back-compat for older keys
         init_hash = obj.get("initial_signature_hash") or obj.get("init_sig_hex")
         out_hash = obj.get("output_signature_hash") or obj.get("output_sig_hex")
+        # state files from before the algo field were always sha256
+        if obj.get("output_signature_algo", "sha256") != OUTPUT_SIGNATURE_ALGO:
+            out_hash = None
         return ManifestState(
             init_signature_hash=init_hash,
             output_signature_hash=out_hash,
@@ -92,6 +101,7 @@ class ManifestState:
         return json.dumps(
             {
                 "initial_signature_hash": self.init_signature_hash,
+                "output_signature_algo": OUTPUT_SIGNATURE_ALGO,
                 "output_signature_hash": self.output_signature_hash,
             },
             sort_keys=True,
@@ -127,7 +137,7 @@ def perform_initial_job_setup(odin_cfg: OdinConfig,
     qsig: QuickManifestSig = quick_scan_signature(
         root=odin_cfg.repo_dir, exclude=odin_cfg.manifest_exclusions
     )
-    initial_signature_hash = digest(asdict(qsig))
+    initial_signature_hash = digest(qsig.as_dict())
     current_manifest_sig = compute_sha256(manifest_path) if manifest_path.exists() else None
 
     return ManifestInfo(
@@ -202,12 +212,14 @@ def write_manifest_and_state(
         with tracker.record_step(mi.run_id, "generating odin manifest") as rec:
             try:
                 logger.info("generating manifest -> %s", tmp_path)
-                write_manifest(
-                    root_dir=mi.repo_dir,
-                    manifest_path=str(tmp_path),
-                    format_type="yaml",
-                    exclude_patterns=odin_cfg.manifest_exclusions,
-                )
+                with HashCache(odin_cfg.manifest_dir / "sha_cache.db") as hash_cache:
+                    write_manifest(
+                        root_dir=mi.repo_dir,
+                        manifest_path=str(tmp_path),
+                        format_type="yaml",
+                        exclude_patterns=odin_cfg.manifest_exclusions,
+                        hash_cache=hash_cache,
+                    )
                 os.replace(tmp_path, mi.manifest_path)
                 rec["status"] = "success"
             except Exception as e:
@@ -251,23 +263,23 @@ def odin_run_manifest_job() -> None:
 
     try:
         odin_cfg: OdinConfig = load_config()
-        tracker = Tracker()
-        tracker.start_run(
-            run_id=run_id,
-            run_name="generate_manifest",
-            meta={"job": "generate manifest"},
-        )
 
+        # decide before touching the audit DB: a no-op run writes nothing
         mi = perform_initial_job_setup(odin_cfg, run_id=run_id, logger=logger)
         st = load_state_if_any(mi.state_path, logger=logger)
         decision = decide_job_state(mi, st, logger=logger)
 
         if decision == JobState.STILL_CURRENT_SHOULD_SKIP:
             logger.info("skipping build: manifest is current")
-            tracker.finish_run(run_id, "success", output_path=str(mi.manifest_path), output_sig_hash=st.output_signature_hash if st else None)
             return
 
         # For all other cases: (re)build
+        tracker = Tracker()
+        tracker.start_run(
+            run_id=run_id,
+            run_name="generate_manifest",
+            meta={"job": "generate manifest"},
+        )
         write_manifest_and_state(odin_cfg, mi, tracker=tracker, logger=logger)
 
     except Exception as e: